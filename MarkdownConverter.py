@@ -6,19 +6,22 @@ A single interface for converting Markdown to PDF, Word (DOCX), or LaTeX.
 Choose your output format interactively and paste your Markdown content.
 Requires Pandoc to be installed and on your PATH.
 For LaTeX output, also requires pdflatex.
+
+Run with --spool DIR to process queued jobs from DIR/inbox as a daemon
+instead of prompting (see spool_daemon.py), or with --preview FILE for a
+live HTML draft preview (see preview_server.py).
 """
 import sys
 import os
-import subprocess
-from markdown_utils import (
-    get_unique_filename, check_pandoc, check_pdflatex,
-    get_markdown_input, ensure_output_dir, get_dated_filename,
-    run_pandoc, run_pdflatex, save_markdown_file,
-    load_config, build_pandoc_args, open_file, sanitize_text
-)
+import time
+import argparse
+# Clients of a running warm daemon only need this; the converter modules are
+# imported by the functions that convert in-process
+from warm_daemon import find_daemon, run_in_daemon, relay_response
 
 def check_dependencies():
     """Check if required dependencies are available."""
+    from markdown_utils import check_pandoc, check_pdflatex
     check_pandoc()
     return check_pdflatex()
 
@@ -53,87 +56,215 @@ def get_markdown_input_with_prompt():
         + "-" * 60 + "\n"
     )
 
+    from markdown_utils import get_markdown_input
     return get_markdown_input(prompt)
 
-def convert_to_pdf(markdown_text, config=None, slug=None):
-    """Convert Markdown to PDF."""
+def convert_to_pdf(markdown_text, config=None, slug=None, work_dir=None):
+    """
+    Convert Markdown to PDF.
+
+    Output, images and configuration are relative to `work_dir` (default:
+    the current directory).
+    """
+    from markdown_utils import (
+        load_config, sanitize_text, ensure_output_dir, get_dated_filename, release_filename,
+        build_pandoc_args, run_pandoc, save_markdown_file, open_file
+    )
+    from markdown_normalizer import normalize_markdown
+    from image_assets import prepare_images
+    from bibliography import add_bibliography_args
+    from output_catalog import open_catalog, record_conversion
+    from output_optimizer import optimize_output, report_saving
+
     if config is None:
-        config = load_config()
+        config = load_config(work_dir)
+
+    started = time.perf_counter()
+    timings = {}
+    catalog = open_catalog(config)
 
     # Remove unsupported characters before conversion
     markdown_text = sanitize_text(markdown_text)
 
-    output_dir = 'PDF'
+    output_dir = os.path.join(work_dir or '', 'PDF')
     ensure_output_dir(output_dir)
-    output_pdf = get_dated_filename(output_dir, 'pdf', markdown_text, slug)
+    output_pdf = get_dated_filename(output_dir, 'pdf', markdown_text, slug, catalog)
     
-    # Build pandoc arguments with configuration
-    base_args = ['pandoc', '-f', 'markdown', '-o', output_pdf]
-    pandoc_args = build_pandoc_args(base_args, config['pdf'])
+    try:
+        # Build pandoc arguments with configuration
+        base_args = ['pandoc', '-f', 'markdown', '-o', output_pdf]
+        pandoc_args = build_pandoc_args(base_args, config['pdf'])
+        pandoc_args = add_bibliography_args(pandoc_args, markdown_text, config)
+
+        # Rewrite oversized tables and code blocks that would slow pandoc and pdflatex
+        stage_start = time.perf_counter()
+        pandoc_text = normalize_markdown(markdown_text, 'pdf', config)
+        timings['normalize'] = time.perf_counter() - stage_start
+
+        # Point image references at downscaled, cached copies
+        stage_start = time.perf_counter()
+        pandoc_text = prepare_images(pandoc_text, 'pdf', config, work_dir)
+        timings['images'] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        success = run_pandoc(pandoc_args, pandoc_text, cwd=work_dir)
+        timings['pandoc'] = time.perf_counter() - stage_start
+    finally:
+        # Once pandoc has run, the output file itself keeps the name taken
+        release_filename(output_pdf)
 
-    success = run_pandoc(pandoc_args, markdown_text)
     if not success:
         print(f"⚠️  Warning: pandoc reported errors while generating {output_pdf}.")
 
+    stage_start = time.perf_counter()
+    report_saving(optimize_output(output_pdf, config))
+    timings['optimize'] = time.perf_counter() - stage_start
+
     # Save the markdown source file if configured
+    md_file = None
     if config['global']['save_markdown_source']:
-        md_file = save_markdown_file(markdown_text, output_pdf)
+        md_file = save_markdown_file(markdown_text, output_pdf, config)
         if md_file:
             print(f"📝 Markdown saved: {md_file}")
 
+    timings['total'] = time.perf_counter() - started
+    record_conversion(catalog, 'pdf', markdown_text, slug, pandoc_args, output_pdf,
+                      markdown_path=md_file, timings=timings)
+
     if config['global'].get('auto_open_output') and os.path.exists(output_pdf):
         open_file(output_pdf)
 
     return output_pdf
 
-def convert_to_word(markdown_text, config=None, slug=None):
-    """Convert Markdown to Word (DOCX)."""
+def convert_to_word(markdown_text, config=None, slug=None, work_dir=None):
+    """
+    Convert Markdown to Word (DOCX).
+
+    Output, images and configuration are relative to `work_dir` (default:
+    the current directory).
+    """
+    from markdown_utils import (
+        load_config, sanitize_text, ensure_output_dir, get_dated_filename, release_filename,
+        build_pandoc_args, run_pandoc, save_markdown_file, open_file
+    )
+    from markdown_normalizer import normalize_markdown
+    from image_assets import prepare_images
+    from bibliography import add_bibliography_args
+    from output_catalog import open_catalog, record_conversion
+    from output_optimizer import optimize_output, report_saving
+
     if config is None:
-        config = load_config()
+        config = load_config(work_dir)
+
+    started = time.perf_counter()
+    timings = {}
+    catalog = open_catalog(config)
 
     # Remove unsupported characters before conversion
     markdown_text = sanitize_text(markdown_text)
 
-    output_dir = 'DOCX'
+    output_dir = os.path.join(work_dir or '', 'DOCX')
     ensure_output_dir(output_dir)
-    output_docx = get_dated_filename(output_dir, 'docx', markdown_text, slug)
+    output_docx = get_dated_filename(output_dir, 'docx', markdown_text, slug, catalog)
     
-    # Build pandoc arguments with configuration
-    base_args = ['pandoc', '-f', 'markdown', '-t', 'docx', '-o', output_docx]
-    pandoc_args = build_pandoc_args(base_args, config['docx'])
+    try:
+        # Build pandoc arguments with configuration
+        base_args = ['pandoc', '-f', 'markdown', '-t', 'docx', '-o', output_docx]
+        pandoc_args = build_pandoc_args(base_args, config['docx'])
+        pandoc_args = add_bibliography_args(pandoc_args, markdown_text, config)
+
+        # Rewrite oversized tables and code blocks that would slow pandoc and pdflatex
+        stage_start = time.perf_counter()
+        pandoc_text = normalize_markdown(markdown_text, 'docx', config)
+        timings['normalize'] = time.perf_counter() - stage_start
+
+        # Point image references at downscaled, cached copies
+        stage_start = time.perf_counter()
+        pandoc_text = prepare_images(pandoc_text, 'docx', config, work_dir)
+        timings['images'] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        success = run_pandoc(pandoc_args, pandoc_text, cwd=work_dir)
+        timings['pandoc'] = time.perf_counter() - stage_start
+    finally:
+        # Once pandoc has run, the output file itself keeps the name taken
+        release_filename(output_docx)
 
-    success = run_pandoc(pandoc_args, markdown_text)
     if not success:
         print(f"⚠️  Warning: pandoc reported errors while generating {output_docx}.")
 
+    stage_start = time.perf_counter()
+    report_saving(optimize_output(output_docx, config))
+    timings['optimize'] = time.perf_counter() - stage_start
+
     # Save the markdown source file if configured
+    md_file = None
     if config['global']['save_markdown_source']:
-        md_file = save_markdown_file(markdown_text, output_docx)
+        md_file = save_markdown_file(markdown_text, output_docx, config)
         if md_file:
             print(f"📝 Markdown saved: {md_file}")
 
+    timings['total'] = time.perf_counter() - started
+    record_conversion(catalog, 'docx', markdown_text, slug, pandoc_args, output_docx,
+                      markdown_path=md_file, timings=timings)
+
     if config['global'].get('auto_open_output') and os.path.exists(output_docx):
         open_file(output_docx)
 
     return output_docx
 
-def convert_to_latex(markdown_text, has_pdflatex, config=None, slug=None):
-    """Convert Markdown to LaTeX and optionally compile to PDF."""
-    if config is None:
-        config = load_config()
+def latex_pandoc_stage(markdown_text, config, slug=None, work_dir=None):
+    """
+    Run the pandoc half of convert_to_latex: write the .tex file and save the source.
+
+    Returns:
+        dict: Stage state passed to latex_tex_stage; 'output_tex' is None if
+        pandoc did not create the file ('failed_tex' then holds its path)
+    """
+    from markdown_utils import (
+        sanitize_text, ensure_output_dir, get_dated_filename, release_filename,
+        build_pandoc_args, run_pandoc, save_markdown_file
+    )
+    from markdown_normalizer import normalize_markdown
+    from image_assets import prepare_images
+    from bibliography import add_bibliography_args
+    from output_catalog import open_catalog
+
+    started = time.perf_counter()
+    timings = {}
+    catalog = open_catalog(config)
 
     # Remove unsupported characters before conversion
     markdown_text = sanitize_text(markdown_text)
 
-    output_dir = 'LaTeX'
+    output_dir = os.path.join(work_dir or '', 'LaTeX')
     ensure_output_dir(output_dir)
-    output_tex = get_dated_filename(output_dir, 'tex', markdown_text, slug)
+    output_tex = get_dated_filename(output_dir, 'tex', markdown_text, slug, catalog)
+    image_dir = os.path.splitext(output_tex)[0] + '-images'
     
-    # Build pandoc arguments with configuration
-    base_args = ['pandoc', '-s', '-f', 'markdown', '-t', 'latex', '-o', output_tex]
-    pandoc_args = build_pandoc_args(base_args, config['latex'])
+    try:
+        # Build pandoc arguments with configuration
+        base_args = ['pandoc', '-s', '-f', 'markdown', '-t', 'latex', '-o', output_tex]
+        pandoc_args = build_pandoc_args(base_args, config['latex'])
+        pandoc_args = add_bibliography_args(pandoc_args, markdown_text, config)
+
+        # Rewrite oversized tables and code blocks that would slow pandoc and pdflatex
+        stage_start = time.perf_counter()
+        pandoc_text = normalize_markdown(markdown_text, 'latex', config)
+        timings['normalize'] = time.perf_counter() - stage_start
+
+        # Copy downscaled images next to the .tex, keeping the references relative
+        stage_start = time.perf_counter()
+        pandoc_text = prepare_images(pandoc_text, 'latex', config, work_dir, image_dir)
+        timings['images'] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        success = run_pandoc(pandoc_args, pandoc_text, cwd=work_dir)
+        timings['pandoc'] = time.perf_counter() - stage_start
+    finally:
+        # Once pandoc has run, the output file itself keeps the name taken
+        release_filename(output_tex)
 
-    success = run_pandoc(pandoc_args, markdown_text)
     if not success:
         print(f"⚠️  Warning: pandoc reported errors while generating {output_tex}.")
 
@@ -141,19 +272,67 @@ def convert_to_latex(markdown_text, has_pdflatex, config=None, slug=None):
         print(f"✅ LaTeX created: {output_tex}")
     else:
         print(f"❌ Failed to create LaTeX file: {output_tex}")
-        return output_tex, None
+        return {'output_tex': None, 'failed_tex': output_tex}
     
     # Save the markdown source file if configured
+    md_file = None
     if config['global']['save_markdown_source']:
-        md_file = save_markdown_file(markdown_text, output_tex)
+        md_file = save_markdown_file(markdown_text, output_tex, config)
         if md_file:
             print(f"📝 Markdown saved: {md_file}")
-    
+
+    return {
+        'markdown_text': markdown_text,
+        'slug': slug,
+        'output_dir': output_dir,
+        'output_tex': output_tex,
+        'work_dir': work_dir,
+        'image_dir': image_dir,
+        'pandoc_args': pandoc_args,
+        'md_file': md_file,
+        'catalog': catalog,
+        'timings': timings,
+        'elapsed': time.perf_counter() - started,
+    }
+
+def latex_tex_stage(stage, has_pdflatex, config):
+    """
+    Run the TeX half of convert_to_latex on the state from latex_pandoc_stage.
+
+    Returns:
+        tuple: (tex_file, pdf_file or None)
+    """
+    from markdown_utils import run_pdflatex, open_file
+    from output_catalog import record_conversion
+    from output_optimizer import optimize_output, report_saving
+
+    output_tex = stage['output_tex']
+    timings = stage['timings']
+    started = time.perf_counter()
+
     # Check if PDF compilation should be attempted (config setting and pdflatex availability)
     should_compile = config['latex'].get('compile_pdf', True) and has_pdflatex
     
+    pdf_file = None
+    if should_compile and os.path.exists(output_tex):
+        stage_start = time.perf_counter()
+        # Let pdflatex find the processed copies of the images
+        search_dirs = [stage['image_dir']] if os.path.isdir(stage['image_dir']) else None
+        success, pdf_file = run_pdflatex(output_tex, stage['output_dir'], stage.get('work_dir'),
+                                         search_dirs)
+        timings['pdflatex'] = time.perf_counter() - stage_start
+        if success:
+            stage_start = time.perf_counter()
+            report_saving(optimize_output(pdf_file, config))
+            timings['optimize'] = time.perf_counter() - stage_start
+
+    timings['total'] = stage['elapsed'] + time.perf_counter() - started
+    record_conversion(stage['catalog'], 'latex', stage['markdown_text'], stage['slug'],
+                      stage['pandoc_args'], output_tex,
+                      extra_outputs=[pdf_file] if pdf_file else [],
+                      markdown_path=stage['md_file'], timings=timings)
+
     if should_compile and os.path.exists(output_tex):
-        success, pdf_file = run_pdflatex(output_tex, output_dir)
         if success:
             print(f"✅ PDF created: {pdf_file}")
             if config['global'].get('auto_open_output') and os.path.exists(pdf_file):
@@ -178,11 +357,49 @@ def convert_to_latex(markdown_text, has_pdflatex, config=None, slug=None):
             open_file(output_tex)
         return output_tex, None
 
+def convert_to_latex(markdown_text, has_pdflatex, config=None, slug=None, work_dir=None):
+    """Convert Markdown to LaTeX and optionally compile to PDF."""
+    if config is None:
+        from markdown_utils import load_config
+        config = load_config(work_dir)
+
+    stage = latex_pandoc_stage(markdown_text, config, slug, work_dir)
+    if stage['output_tex'] is None:
+        return stage['failed_tex'], None
+    return latex_tex_stage(stage, has_pdflatex, config)
+
+def parse_args(argv=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Convert Markdown to PDF, Word (DOCX), or LaTeX.")
+    parser.add_argument('--spool', metavar='DIR',
+                        help="Run as a daemon converting queued jobs from DIR/inbox")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of concurrent conversions in daemon mode")
+    parser.add_argument('--preview', metavar='FILE',
+                        help="Serve a live HTML preview of FILE instead of converting")
+    parser.add_argument('--port', type=int, default=8000,
+                        help="Port for the preview server")
+    return parser.parse_args(argv)
+
 def main():
     """Main program flow."""
-    # Check dependencies and load configuration
-    has_pdflatex = check_dependencies()
-    config = load_config()
+    args = parse_args()
+    if args.spool:
+        from spool_daemon import run_daemon
+        run_daemon(args.spool, args.workers)
+        return
+    if args.preview:
+        from preview_server import main as preview_main
+        preview_main([args.preview, '--port', str(args.port)])
+        return
+
+    # Use the warm daemon if it is running; otherwise check dependencies and load configuration
+    daemon_socket = find_daemon()
+    has_pdflatex, config = None, None
+    if daemon_socket is None:
+        from markdown_utils import load_config
+        has_pdflatex = check_dependencies()
+        config = load_config()
     
     while True:
         choice = get_user_choice()
@@ -203,7 +420,22 @@ def main():
         print("\n🔄 Converting...")
         
         try:
-            if choice == '1':
+            response = None
+            if daemon_socket is not None:
+                formats = {'1': 'pdf', '2': 'docx', '3': 'latex'}
+                response = run_in_daemon({'entry': 'converter', 'format': formats[choice],
+                                          'markdown': markdown_text, 'slug': slug}, daemon_socket)
+                if response is None:
+                    # The daemon went away; convert in-process from now on
+                    from markdown_utils import load_config
+                    daemon_socket = None
+                    has_pdflatex = check_dependencies()
+                    config = load_config()
+
+            if response is not None:
+                relay_response(response)
+
+            elif choice == '1':
                 output_file = convert_to_pdf(markdown_text, config, slug)
                 print(f"✅ PDF created: {output_file}")
             
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Bibliography - Cached, pruned bibliographies for citation processing
+
+Large shared `.bib` files are expensive for pandoc to parse. Each configured
+bibliography is converted once to CSL JSON and cached by file mtime and
+content hash. For every document, only the entries it actually cites are
+written to a small pruned bibliography, which is what pandoc's `--citeproc`
+then reads.
+
+Configure bibliographies in the `bibliography` section of
+markdown-converter.json:
+
+    "bibliography": {
+        "files": ["~/refs/library.bib"],
+        "csl": "~/refs/apa.csl"
+    }
+"""
+import os
+import re
+import json
+import hashlib
+import subprocess
+import threading
+
+from markdown_utils import get_tool_environment
+
+
+# Pandoc citation keys: @key, [@key, p. 3; -@other], @{key with spaces}
+CITATION_PATTERN = re.compile(r'(?<![\w@])-?@(\{[^}]+\}|\w[\w:.#$%&+?<>~/-]*)')
+
+# Parsed CSL JSON by content hash, shared across conversions in this process
+_entries_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_cache_dir(bib_config):
+    """Return the bibliography cache directory, creating it if needed."""
+    cache_dir = os.path.expanduser(
+        bib_config.get('cache_dir', '~/.markdown-converter/cache/bibliography')
+    )
+    os.makedirs(os.path.join(cache_dir, 'pruned'), exist_ok=True)
+    return cache_dir
+
+
+def find_citation_keys(markdown_text):
+    """
+    Return the set of citation keys used in `markdown_text`.
+
+    The special key '*' (from `nocite: '@*'`) means every entry.
+    """
+    keys = set()
+    for match in CITATION_PATTERN.finditer(markdown_text):
+        key = match.group(1)
+        if key.startswith('{'):
+            key = key[1:-1]
+        else:
+            # Trailing punctuation belongs to the sentence, not the key
+            key = key.rstrip('.:,;?/-')
+        if key:
+            keys.add(key)
+    if re.search(r'@\*', markdown_text):
+        keys.add('*')
+    return keys
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of the file at `path`."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_index(cache_dir):
+    """Return the cache index mapping .bib paths to their last seen mtime, size and hash."""
+    index_path = os.path.join(cache_dir, 'index.json')
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_index(cache_dir, index):
+    """Atomically write the cache index."""
+    index_path = os.path.join(cache_dir, 'index.json')
+    temp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    os.replace(temp_path, index_path)
+
+
+def convert_to_csl_json(bib_path, csl_path):
+    """
+    Convert a bibliography file to CSL JSON with pandoc.
+
+    Returns:
+        bool: True if `csl_path` was written, False otherwise.
+    """
+    temp_path = f"{csl_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    result = subprocess.run(
+        ['pandoc', bib_path, '-t', 'csljson', '-o', temp_path],
+        env=get_tool_environment(),
+        capture_output=True
+    )
+    if result.returncode != 0 or not os.path.exists(temp_path):
+        print(f"Warning: Failed to convert bibliography {bib_path}: "
+              f"{result.stderr.decode('utf-8', errors='ignore').strip()}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    os.replace(temp_path, csl_path)
+    return True
+
+
+def load_entries(bib_path, cache_dir):
+    """
+    Return the CSL JSON entries of `bib_path`, converting it only if it changed.
+
+    A file whose mtime and size match the cache index is not re-read; one
+    whose mtime changed but whose content did not is not re-converted.
+
+    Returns:
+        dict or None: Entries keyed by citation id, or None if conversion failed
+    """
+    bib_path = os.path.abspath(os.path.expanduser(bib_path))
+    stat = os.stat(bib_path)
+
+    with _cache_lock:
+        index = read_index(cache_dir)
+        seen = index.get(bib_path)
+        if seen and seen['mtime'] == stat.st_mtime and seen['size'] == stat.st_size:
+            digest = seen['sha256']
+        else:
+            digest = hash_file(bib_path)
+
+        if digest in _entries_cache:
+            entries = _entries_cache[digest]
+        else:
+            csl_path = os.path.join(cache_dir, f"{digest}.json")
+            if not os.path.exists(csl_path) and not convert_to_csl_json(bib_path, csl_path):
+                return None
+            with open(csl_path, 'r', encoding='utf-8') as f:
+                entries = {entry['id']: entry for entry in json.load(f) if 'id' in entry}
+            _entries_cache[digest] = entries
+
+        if seen != {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': digest}:
+            index[bib_path] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': digest}
+            write_index(cache_dir, index)
+
+    return entries
+
+
+def build_pruned_bibliography(keys, bib_files, cache_dir):
+    """
+    Write a CSL JSON bibliography containing only `keys`.
+
+    Returns:
+        list: Bibliography paths for pandoc; the pruned file, plus any
+        original files that could not be converted. Empty if none of
+        `keys` is in any bibliography.
+    """
+    selected = {}
+    fallback = []
+    for bib_file in bib_files:
+        entries = load_entries(bib_file, cache_dir)
+        if entries is None:
+            fallback.append(os.path.expanduser(bib_file))
+            continue
+        wanted = entries.keys() if '*' in keys else keys
+        for key in wanted:
+            if key in entries and key not in selected:
+                selected[key] = entries[key]
+
+    if not selected:
+        return fallback
+
+    missing = sorted(keys - set(selected) - {'*'})
+    if missing and not fallback:
+        print(f"Warning: citation key(s) not found in bibliography: {', '.join(missing)}")
+
+    ordered = [selected[key] for key in sorted(selected)]
+    payload = json.dumps(ordered, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    pruned_path = os.path.join(cache_dir, 'pruned', f"{digest}.json")
+    if not os.path.exists(pruned_path):
+        temp_path = f"{pruned_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(temp_path, pruned_path)
+
+    return [pruned_path] + fallback
+
+
+def add_bibliography_args(args, markdown_text, config):
+    """
+    Add citation processing arguments for the citations in `markdown_text`.
+
+    Documents that cite nothing in the configured bibliographies get
+    `args` back unchanged.
+
+    Args:
+        args: List of pandoc arguments
+        markdown_text: String containing markdown content
+        config: Full configuration dict
+
+    Returns:
+        List: Pandoc arguments with --citeproc and --bibliography added
+    """
+    bib_config = config.get('bibliography', {})
+    bib_files = bib_config.get('files', [])
+    if not bib_files:
+        return args
+
+    keys = find_citation_keys(markdown_text)
+    if not keys:
+        return args
+
+    args = args.copy()
+    try:
+        if bib_config.get('prune', True):
+            bibliographies = build_pruned_bibliography(keys, bib_files, get_cache_dir(bib_config))
+        else:
+            bibliographies = [os.path.expanduser(path) for path in bib_files]
+    except Exception as e:
+        print(f"Warning: Failed to prepare bibliography ({e}); using the original files.")
+        bibliographies = [os.path.expanduser(path) for path in bib_files]
+
+    if not bibliographies:
+        return args
+
+    args.append('--citeproc')
+    for path in bibliographies:
+        args.extend(['--bibliography', path])
+    if bib_config.get('csl'):
+        args.extend(['--csl', os.path.expanduser(bib_config['csl'])])
+    return args
@@ -26,7 +26,23 @@ def generate_config_file(filepath="markdown-converter.json"):
             "auto_open_output": config["global"]["auto_open_output"],
             "_auto_open_output_comment": "Automatically open converted files after conversion (set to false to disable)",
             "output_naming": config["global"]["output_naming"],
-            "_output_naming_comment": "Naming scheme: 'date' (YYYYMMDD + first words), 'prompt' (ask user), 'custom' (not implemented)"
+            "_output_naming_comment": "Naming scheme: 'date' (YYYYMMDD + first words), 'prompt' (ask user), 'custom' (not implemented)",
+            "source_store": {
+                "enabled": config["global"]["source_store"]["enabled"],
+                "_enabled_comment": "Store each saved source once and hardlink it next to every output",
+                "dir": config["global"]["source_store"]["dir"],
+                "_dir_comment": "Directory holding the deduplicated sources",
+                "compression": config["global"]["source_store"]["compression"],
+                "_compression_comment": "'none', 'gzip' or 'zstd' (zstd requires the zstandard package); compressed sources are saved as .md.gz/.md.zst"
+            }
+        },
+        
+        "catalog": {
+            "_comment": "SQLite catalog of conversions, searchable with output_catalog.py",
+            "enabled": config["catalog"]["enabled"],
+            "_enabled_comment": "Record every conversion and index its markdown source",
+            "path": config["catalog"]["path"],
+            "_path_comment": "Location of the catalog database"
         },
         
         "pdf": {
@@ -73,6 +89,72 @@ def generate_config_file(filepath="markdown-converter.json"):
             "_document_class_comment": "LaTeX document class: 'article', 'report', 'book', etc.",
             "compile_pdf": config["latex"]["compile_pdf"],
             "_compile_pdf_comment": "Automatically compile LaTeX to PDF (requires pdflatex)"
+        },
+
+        "optimize": {
+            "_comment": "Post-process outputs to make them smaller (also: python output_optimizer.py FILES)",
+            "workers": config["optimize"]["workers"],
+            "_workers_comment": "Files optimized in parallel by output_optimizer.py",
+            "pdf": {
+                "enabled": config["optimize"]["pdf"]["enabled"],
+                "_enabled_comment": "Compress object streams with qpdf (requires qpdf)",
+                "linearize": config["optimize"]["pdf"]["linearize"],
+                "_linearize_comment": "Linearize PDFs for fast first-page display over the web",
+                "ghostscript": config["optimize"]["pdf"]["ghostscript"],
+                "_ghostscript_comment": "Deduplicate fonts and images with Ghostscript first (re-renders the PDF)"
+            },
+            "docx": {
+                "enabled": config["optimize"]["docx"]["enabled"],
+                "_enabled_comment": "Repack Word documents with maximum compression",
+                "dedupe_media": config["optimize"]["docx"]["dedupe_media"],
+                "_dedupe_media_comment": "Store identical images only once"
+            }
+        },
+
+        "bibliography": {
+            "_comment": "Citation processing with pandoc --citeproc",
+            "files": config["bibliography"]["files"],
+            "_files_comment": "Bibliography files (.bib, .json, ...); documents citing @keys are processed with --citeproc",
+            "csl": config["bibliography"]["csl"],
+            "_csl_comment": "Optional CSL style file for formatting citations",
+            "prune": config["bibliography"]["prune"],
+            "_prune_comment": "Give pandoc only the entries each document cites, from a cached CSL JSON copy",
+            "cache_dir": config["bibliography"]["cache_dir"],
+            "_cache_dir_comment": "Directory for converted and pruned bibliographies"
+        },
+
+        "normalize": {
+            "_comment": "Rewrite oversized tables and code blocks before pandoc",
+            "enabled": config["normalize"]["enabled"],
+            "max_table_rows": config["normalize"]["max_table_rows"],
+            "_max_table_rows_comment": "Tables with more rows than this are rewritten",
+            "table_chunk_rows": config["normalize"]["table_chunk_rows"],
+            "_table_chunk_rows_comment": "Rows per chunk when a table is split",
+            "max_code_lines": config["normalize"]["max_code_lines"],
+            "_max_code_lines_comment": "Code blocks are cut off after this many lines (0 = never)",
+            "max_line_length": config["normalize"]["max_line_length"],
+            "_max_line_length_comment": "Longest code line before long_lines applies (0 = no limit)",
+            "pdf": config["normalize"]["pdf"],
+            "docx": config["normalize"]["docx"],
+            "latex": config["normalize"]["latex"],
+            "_tables_comment": "Per format: tables 'split', 'latex' (PDF/LaTeX), 'docx' (DOCX) or 'keep'; long_lines 'wrap', 'truncate' or 'keep'"
+        },
+
+        "images": {
+            "_comment": "Local image preprocessing (downscaling requires Pillow, SVG conversion requires rsvg-convert)",
+            "enabled": config["images"]["enabled"],
+            "_enabled_comment": "Downscale and cache local images before conversion",
+            "cache_dir": config["images"]["cache_dir"],
+            "_cache_dir_comment": "Directory for processed images, shared across documents",
+            "workers": config["images"]["workers"],
+            "_workers_comment": "Number of images processed in parallel",
+            "max_width_in": config["images"]["max_width_in"],
+            "_max_width_in_comment": "Widest an image is ever displayed, in inches",
+            "jpeg_quality": config["images"]["jpeg_quality"],
+            "_jpeg_quality_comment": "JPEG recompression quality (1-95)",
+            "pdf": config["images"]["pdf"],
+            "docx": config["images"]["docx"],
+            "_dpi_comment": "Target resolution per output format"
         }
     }
     
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Image Assets - Local image preprocessing for Markdown conversion
+
+Resolves local image references in Markdown, downsamples and recompresses
+raster images to the DPI configured for each output format, and converts
+SVG files to PDF or PNG. Processed images are stored in a content-addressed
+cache shared across documents, so a figure used by many documents is only
+processed once per format.
+
+Raster processing uses Pillow when it is installed; SVG conversion uses
+rsvg-convert when it is on the PATH. When neither is available the original
+image is referenced unchanged.
+"""
+import os
+import re
+import shutil
+import hashlib
+import threading
+import subprocess
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from markdown_utils import get_tool_environment
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional
+    Image = ImageOps = None
+
+
+# Matches ![alt](path) and ![alt](path "title"), including <path> syntax
+IMAGE_PATTERN = re.compile(
+    r'(!\[[^\]]*\]\()\s*(<[^>]+>|[^)\s]+)(\s+(?:"[^"]*"|\'[^\']*\'))?\s*(\))'
+)
+
+RASTER_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+SVG_EXTENSIONS = {'.svg'}
+
+# Outputs that are themselves sources (.tex) keep relative image references
+# instead of pointing at machine-local cache paths; the processed images are
+# copied next to the output under those names
+SOURCE_FORMATS = {'latex'}
+
+# Bump when the processing below changes so stale cache entries are ignored
+CACHE_VERSION = 2
+
+
+def get_image_cache_dir(image_config):
+    """Return the image cache directory, creating it if needed."""
+    cache_dir = os.path.expanduser(
+        image_config.get('cache_dir', '~/.markdown-converter/cache/images')
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def find_image_references(markdown_text):
+    """Return the list of image paths referenced in `markdown_text`."""
+    paths = []
+    for match in IMAGE_PATTERN.finditer(markdown_text):
+        path = match.group(2)
+        if path.startswith('<') and path.endswith('>'):
+            path = path[1:-1]
+        paths.append(path)
+    return paths
+
+
+def is_local_image(path):
+    """Return True if `path` refers to a local PNG, JPEG or SVG file."""
+    if re.match(r'^[A-Za-z][A-Za-z0-9+.-]*://', path) or path.startswith('data:'):
+        return False
+    ext = os.path.splitext(path)[1].lower()
+    return ext in RASTER_EXTENSIONS or ext in SVG_EXTENSIONS
+
+
+def get_format_settings(image_config, output_format):
+    """Return the image settings for `output_format` merged over the defaults."""
+    settings = {
+        'dpi': 300,
+        'max_width_in': 6.5,
+        'jpeg_quality': 85,
+    }
+    for key in settings:
+        if key in image_config:
+            settings[key] = image_config[key]
+    settings.update(image_config.get(output_format, {}))
+    return settings
+
+
+def get_target_extension(source_path, output_format):
+    """Return the extension the processed image should have for `output_format`."""
+    ext = os.path.splitext(source_path)[1].lower()
+    if ext in SVG_EXTENSIONS:
+        # pdflatex embeds PDF natively; Word needs a raster image
+        return '.png' if output_format == 'docx' else '.pdf'
+    return '.jpg' if ext == '.jpeg' else ext
+
+
+def get_cache_key(source_path, output_format, settings):
+    """Return a content-addressed cache key for an image and its settings."""
+    digest = hashlib.sha256()
+    with open(source_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    digest.update(
+        f"|v{CACHE_VERSION}|{get_target_extension(source_path, output_format)}"
+        f"|{settings['dpi']}|{settings['max_width_in']}|{settings['jpeg_quality']}".encode('utf-8')
+    )
+    return digest.hexdigest()
+
+
+def process_raster_image(source_path, target_path, settings):
+    """
+    Downsample and recompress a PNG or JPEG image.
+
+    Returns:
+        bool: True if `target_path` was written, False otherwise.
+    """
+    if Image is None:
+        return False
+
+    max_px = int(settings['dpi'] * settings['max_width_in'])
+    with Image.open(source_path) as image:
+        # Saving drops EXIF data, so apply its Orientation to the pixels first
+        image = ImageOps.exif_transpose(image)
+        if image.width > max_px:
+            height = max(1, round(image.height * max_px / image.width))
+            image = image.resize((max_px, height), Image.LANCZOS)
+        dpi = (settings['dpi'], settings['dpi'])
+        if target_path.endswith('.jpg'):
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.save(target_path, 'JPEG', quality=settings['jpeg_quality'],
+                       optimize=True, progressive=True, dpi=dpi)
+        else:
+            image.save(target_path, 'PNG', optimize=True, dpi=dpi)
+    return True
+
+
+def process_svg_image(source_path, target_path, settings):
+    """
+    Convert an SVG image to PDF or PNG with rsvg-convert.
+
+    Returns:
+        bool: True if `target_path` was written, False otherwise.
+    """
+    env = get_tool_environment()
+    if shutil.which('rsvg-convert', path=env.get('PATH')) is None:
+        return False
+
+    target_format = 'pdf' if target_path.endswith('.pdf') else 'png'
+    command = ['rsvg-convert', '-f', target_format, '-o', target_path]
+    if target_format == 'png':
+        command.extend(['--dpi-x', str(settings['dpi']), '--dpi-y', str(settings['dpi'])])
+    command.append(source_path)
+
+    result = subprocess.run(command, env=env, capture_output=True)
+    return result.returncode == 0 and os.path.exists(target_path)
+
+
+def process_image(source_path, output_format, settings, cache_dir):
+    """
+    Return the cached, processed version of `source_path` for `output_format`.
+
+    The image is processed only if it is not already in the cache. If it
+    cannot be processed, the original path is returned.
+    """
+    try:
+        key = get_cache_key(source_path, output_format, settings)
+        target_path = os.path.join(
+            cache_dir, key[:2], key + get_target_extension(source_path, output_format)
+        )
+        if os.path.exists(target_path):
+            return target_path
+
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        # Write to a per-thread temporary name so concurrent runs never see partial files
+        temp_path = (f"{target_path}.{os.getpid()}.{threading.get_ident()}"
+                     f".tmp{os.path.splitext(target_path)[1]}")
+        if os.path.splitext(source_path)[1].lower() in SVG_EXTENSIONS:
+            written = process_svg_image(source_path, temp_path, settings)
+        else:
+            written = process_raster_image(source_path, temp_path, settings)
+
+        if not written:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return source_path
+
+        # Keep the original if processing made it larger
+        if (os.path.splitext(source_path)[1].lower() in RASTER_EXTENSIONS
+                and os.path.getsize(temp_path) >= os.path.getsize(source_path)):
+            os.remove(temp_path)
+            shutil.copyfile(source_path, temp_path)
+
+        os.replace(temp_path, target_path)
+        return target_path
+    except Exception as e:
+        print(f"Warning: Failed to process image {source_path}: {e}")
+        return source_path
+
+
+def get_relative_image_name(path, processed_path):
+    """
+    Return the relative name a processed copy of `path` is stored under.
+
+    The name keeps the reference's directories and stem and takes the
+    processed file's extension (an SVG becomes .pdf). Returns None for
+    absolute paths and paths outside the document's directory.
+    """
+    name = os.path.normpath(os.path.expanduser(path))
+    if os.path.isabs(name) or name.split(os.sep)[0] == os.pardir:
+        return None
+    return os.path.splitext(name)[0] + os.path.splitext(processed_path)[1]
+
+
+def prepare_images(markdown_text, output_format, config, base_dir=None, image_dir=None):
+    """
+    Replace local image references in `markdown_text` with processed copies.
+
+    For LaTeX output the references stay relative, so the .tex file remains
+    portable: the processed images are copied into `image_dir` under the
+    same relative names (SVGs renamed to .pdf), for pdflatex to find there.
+
+    Args:
+        markdown_text: String containing markdown content
+        output_format: One of 'pdf', 'docx' or 'latex'
+        config: Full configuration dict
+        base_dir: Directory relative image paths are resolved against (default: cwd)
+        image_dir: Directory for the processed copies of LaTeX output; without
+            it, LaTeX output is returned unchanged
+
+    Returns:
+        str: Markdown text referencing the processed images
+    """
+    image_config = config.get('images', {})
+    if not image_config.get('enabled', True):
+        return markdown_text
+    if output_format in SOURCE_FORMATS and image_dir is None:
+        return markdown_text
+
+    if base_dir is None:
+        base_dir = os.getcwd()
+
+    # Resolve every distinct local image that exists on disk
+    sources = {}
+    for path in find_image_references(markdown_text):
+        if path in sources or not is_local_image(path):
+            continue
+        resolved = os.path.join(base_dir, os.path.expanduser(path))
+        if os.path.isfile(resolved):
+            sources[path] = os.path.abspath(resolved)
+
+    if not sources:
+        return markdown_text
+
+    settings = get_format_settings(image_config, output_format)
+    cache_dir = get_image_cache_dir(image_config)
+    workers = image_config.get('workers') or min(8, os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each image runs in a copy of the caller's context, so a warm daemon
+        # job's tool environment and captured output reach the pool threads
+        futures = {
+            path: executor.submit(contextvars.copy_context().run, process_image,
+                                  resolved, output_format, settings, cache_dir)
+            for path, resolved in sources.items()
+        }
+        processed = {path: future.result() for path, future in futures.items()}
+
+    if output_format in SOURCE_FORMATS:
+        copied = {}
+        for path, processed_path in processed.items():
+            name = get_relative_image_name(path, processed_path)
+            if processed_path == sources[path] or name is None:
+                continue  # Unprocessed images are found at their original paths
+            target_path = os.path.join(image_dir, name)
+            try:
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                shutil.copyfile(processed_path, target_path)
+                copied[path] = name
+            except OSError as e:
+                print(f"Warning: Failed to copy image {path} to {image_dir}: {e}")
+        processed = copied
+
+    def replace(match):
+        path = match.group(2)
+        if path.startswith('<') and path.endswith('>'):
+            path = path[1:-1]
+        if path not in processed or processed[path] == path:
+            return match.group(0)
+        return f"{match.group(1)}<{processed[path]}>{match.group(3) or ''}{match.group(4)}"
+
+    return IMAGE_PATTERN.sub(replace, markdown_text)
@@ -12,20 +12,15 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 from markdown_utils import (
     check_pandoc, get_markdown_input, ensure_output_dir, 
-    get_dated_filename, run_pandoc, save_markdown_file,
+    get_dated_filename, release_filename, run_pandoc, save_markdown_file,
     load_config, build_pandoc_args
 )
+from warm_daemon import find_daemon, run_in_daemon, relay_response
 
-def main():
-    # Ensure pandoc is available and load configuration
-    check_pandoc()
-    config = load_config()
-
-    # Get Markdown input from user
-    markdown_text = get_markdown_input()
-
+def convert(markdown_text, config, work_dir=None):
+    """Convert Markdown text to PDF in `work_dir` (default: the current directory)."""
     # Setup output
-    output_dir = 'PDF'
+    output_dir = os.path.join(work_dir or '', 'PDF')
     ensure_output_dir(output_dir)
     output_pdf = get_dated_filename(output_dir, 'pdf', markdown_text)
 
@@ -34,15 +29,37 @@ def main():
     pandoc_args = build_pandoc_args(base_args, config['pdf'])
     
     # Convert Markdown to PDF via Pandoc
-    run_pandoc(pandoc_args, markdown_text)
+    run_pandoc(pandoc_args, markdown_text, cwd=work_dir)
+    release_filename(output_pdf)
     
     # Save the markdown source file if configured
     if config['global']['save_markdown_source']:
-        md_file = save_markdown_file(markdown_text, output_pdf)
+        md_file = save_markdown_file(markdown_text, output_pdf, config)
         if md_file:
             print(f"Markdown saved: {md_file}")
     
     print(f"PDF created: {output_pdf}")
 
+def main():
+    # Use the warm daemon if it is running; otherwise check pandoc and load configuration
+    daemon_socket = find_daemon()
+    if daemon_socket is None:
+        check_pandoc()
+        config = load_config()
+
+    # Get Markdown input from user
+    markdown_text = get_markdown_input()
+
+    if daemon_socket is not None:
+        response = run_in_daemon({'entry': 'legacy-pdf', 'markdown': markdown_text}, daemon_socket)
+        if response is not None:
+            relay_response(response)
+            return
+        # The daemon went away; convert in-process instead
+        check_pandoc()
+        config = load_config()
+
+    convert(markdown_text, config)
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+"""
+Load Test - Measure conversion throughput and latency under concurrency
+
+Drives convert_to_pdf, convert_to_word and convert_to_latex over a synthetic
+corpus at a configurable concurrency and request rate, then reports
+throughput, p50/p95/p99 latency, queue wait, and the resident memory of this
+process and its pandoc/pdflatex children over time.
+
+When pandoc or pdflatex are not installed (or with --stub-tools), stand-in
+executables with configurable latency are used instead, so the harness
+measures the converter's own overhead and scheduling.
+
+Results are written as JSON and as a plain-text summary that can be diffed
+between versions:
+
+    python load_test.py --requests 200 --concurrency 8 --rate 20 --output results/v1
+
+With --pathological, a corpus of oversized tables and code blocks is
+converted with the Markdown normalizer disabled and enabled instead, and
+the time and child-process memory saved are reported.
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from markdown_utils import get_default_config
+
+
+STUB_TEMPLATE = '''#!{python}
+import os, sys, time, random
+latency = float(os.environ.get('{env}', '0'))
+jitter = float(os.environ.get('MARKDOWN_STUB_JITTER', '0'))
+time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+{body}
+'''
+
+PANDOC_STUB_BODY = '''args = sys.argv[1:]
+data = sys.stdin.buffer.read()
+if '-o' in args:
+    with open(args[args.index('-o') + 1], 'wb') as f:
+        f.write(data)
+'''
+
+PDFLATEX_STUB_BODY = '''tex = sys.argv[-1]
+out_dir = os.path.dirname(tex)
+for arg in sys.argv[1:]:
+    if arg.startswith('-output-directory='):
+        out_dir = arg.split('=', 1)[1]
+pdf = os.path.join(out_dir, os.path.splitext(os.path.basename(tex))[0] + '.pdf')
+with open(tex, 'rb') as src, open(pdf, 'wb') as dst:
+    dst.write(src.read())
+'''
+
+
+def generate_corpus(count, seed=0):
+    """
+    Return `count` synthetic Markdown documents of varied size and features.
+
+    Documents mix paragraphs, lists, tables, code blocks and math so that
+    every conversion path is exercised.
+    """
+    rng = random.Random(seed)
+    words = ('alpha beta gamma delta report quarterly revenue figure table result '
+             'analysis method data model sample value growth summary').split()
+
+    def sentence():
+        return ' '.join(rng.choice(words) for _ in range(rng.randint(6, 16))).capitalize() + '.'
+
+    corpus = []
+    for index in range(count):
+        parts = [f"# Document {index} {rng.choice(words).capitalize()}"]
+        for section in range(rng.randint(1, 6)):
+            parts.append(f"## Section {section + 1}")
+            parts.append(' '.join(sentence() for _ in range(rng.randint(2, 12))))
+            feature = rng.random()
+            if feature < 0.25:
+                rows = rng.randint(3, 40)
+                parts.append("| Item | Value | Notes |\n|---|---|---|\n" + '\n'.join(
+                    f"| {rng.choice(words)} | {rng.randint(0, 999)} | {rng.choice(words)} |"
+                    for _ in range(rows)
+                ))
+            elif feature < 0.45:
+                parts.append("```python\n" + '\n'.join(
+                    f"value_{line} = compute({line})" for line in range(rng.randint(3, 30))
+                ) + "\n```")
+            elif feature < 0.6:
+                parts.append("$$\\sum_{i=1}^{n} x_i^2 = \\int_0^1 f(x)\\,dx$$")
+            else:
+                parts.append('\n'.join(f"- {sentence()}" for _ in range(rng.randint(2, 8))))
+        corpus.append('\n\n'.join(parts) + '\n')
+    return corpus
+
+
+def percentile(values, pct):
+    """Return the `pct` percentile of `values` using the nearest-rank method."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def install_stub_tools(stub_dir, names):
+    """Write stand-in executables for `names` into `stub_dir`."""
+    bodies = {'pandoc': PANDOC_STUB_BODY, 'pdflatex': PDFLATEX_STUB_BODY}
+    for name in names:
+        path = os.path.join(stub_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(STUB_TEMPLATE.format(
+                python=sys.executable,
+                env=f"MARKDOWN_STUB_{name.upper()}_LATENCY",
+                body=bodies[name],
+            ))
+        os.chmod(path, 0o755)
+
+
+@contextlib.contextmanager
+def work_environment(stub_tools=None, pandoc_latency=0.05, pdflatex_latency=0.2,
+                     latency_jitter=0.0):
+    """
+    Run the body in a temporary working directory, with stand-in tools if needed.
+
+    Yields:
+        list: Names of the tools replaced by stand-ins
+    """
+    stubbed = [
+        name for name in ('pandoc', 'pdflatex')
+        if stub_tools or (stub_tools is None and shutil.which(name) is None)
+    ]
+
+    original_cwd = os.getcwd()
+    original_env = {key: os.environ.get(key) for key in (
+        'PATH', 'MARKDOWN_STUB_PANDOC_LATENCY', 'MARKDOWN_STUB_PDFLATEX_LATENCY',
+        'MARKDOWN_STUB_JITTER',
+    )}
+
+    with tempfile.TemporaryDirectory(prefix='markdown-load-') as work_dir:
+        try:
+            if stubbed:
+                stub_dir = os.path.join(work_dir, 'bin')
+                os.makedirs(stub_dir)
+                install_stub_tools(stub_dir, stubbed)
+                os.environ['PATH'] = stub_dir + os.pathsep + os.environ.get('PATH', '')
+                os.environ['MARKDOWN_STUB_PANDOC_LATENCY'] = str(pandoc_latency)
+                os.environ['MARKDOWN_STUB_PDFLATEX_LATENCY'] = str(pdflatex_latency)
+                os.environ['MARKDOWN_STUB_JITTER'] = str(latency_jitter)
+            os.chdir(work_dir)
+            yield stubbed
+        finally:
+            os.chdir(original_cwd)
+            for key, value in original_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+def get_process_tree_rss(root_pid):
+    """
+    Return {pid: rss_kb} for `root_pid` and all of its descendants.
+    """
+    try:
+        output = subprocess.run(
+            ['ps', '-A', '-o', 'pid=,ppid=,rss='], capture_output=True, text=True
+        ).stdout
+    except OSError:
+        return {}
+
+    children = {}
+    rss = {}
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) != 3 or not all(field.isdigit() for field in fields):
+            continue
+        pid, ppid, kb = (int(field) for field in fields)
+        children.setdefault(ppid, []).append(pid)
+        rss[pid] = kb
+
+    tree = {}
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        if pid in rss:
+            tree[pid] = rss[pid]
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+def sample_memory(stop_event, interval, started, samples):
+    """Append RSS samples of this process tree to `samples` until stopped."""
+    root_pid = os.getpid()
+    while not stop_event.is_set():
+        tree = get_process_tree_rss(root_pid)
+        samples.append({
+            't': round(time.perf_counter() - started, 3),
+            'self_kb': tree.get(root_pid, 0),
+            'children_kb': sum(kb for pid, kb in tree.items() if pid != root_pid),
+            'processes': len(tree),
+        })
+        stop_event.wait(interval)
+
+
+def run_request(output_format, markdown_text, config, has_pdflatex, enqueued):
+    """Run one conversion and return its timing record."""
+    # Imported here so --help works without the converter's dependencies
+    from MarkdownConverter import convert_to_pdf, convert_to_word, convert_to_latex
+
+    started = time.perf_counter()
+    try:
+        if output_format == 'pdf':
+            outputs = [convert_to_pdf(markdown_text, config)]
+        elif output_format == 'docx':
+            outputs = [convert_to_word(markdown_text, config)]
+        else:
+            tex_file, pdf_file = convert_to_latex(markdown_text, has_pdflatex, config)
+            outputs = [tex_file] + ([pdf_file] if pdf_file else [])
+        success = all(os.path.exists(path) for path in outputs)
+    except Exception:
+        success = False
+    finished = time.perf_counter()
+    return {
+        'format': output_format,
+        'success': success,
+        'queue_wait': started - enqueued,
+        'service': finished - started,
+        'latency': finished - enqueued,
+    }
+
+
+def summarize(values):
+    """Return mean and p50/p95/p99/max of `values` in milliseconds."""
+    if not values:
+        return {}
+    return {
+        'mean_ms': round(1000 * sum(values) / len(values), 2),
+        'p50_ms': round(1000 * percentile(values, 50), 2),
+        'p95_ms': round(1000 * percentile(values, 95), 2),
+        'p99_ms': round(1000 * percentile(values, 99), 2),
+        'max_ms': round(1000 * max(values), 2),
+    }
+
+
+def run_load_test(requests=100, concurrency=4, rate=0.0, formats=('pdf', 'docx', 'latex'),
+                  corpus_size=20, stub_tools=None, pandoc_latency=0.05, pdflatex_latency=0.2,
+                  latency_jitter=0.0, sample_interval=0.25, seed=0):
+    """
+    Run a load test in a temporary directory and return the results.
+
+    Args:
+        requests: Total number of conversions
+        concurrency: Number of conversions allowed to run at once
+        rate: Arrival rate in requests/second; 0 submits everything at once
+        formats: Output formats, cycled through in order
+        corpus_size: Number of distinct synthetic documents
+        stub_tools: Use stand-in pandoc/pdflatex; None uses them only when missing
+        pandoc_latency, pdflatex_latency, latency_jitter: Stand-in tool delays in seconds
+        sample_interval: Seconds between memory samples
+        seed: Seed for the corpus and arrival jitter
+
+    Returns:
+        dict: Parameters, summary statistics and memory samples
+    """
+    corpus = generate_corpus(corpus_size, seed)
+    config = get_default_config()
+    config['global']['auto_open_output'] = False
+    config['catalog']['enabled'] = False
+    config['images']['enabled'] = False
+
+    results = []
+    memory_samples = []
+
+    with work_environment(stub_tools, pandoc_latency, pdflatex_latency,
+                          latency_jitter) as stubbed:
+        has_pdflatex = shutil.which('pdflatex') is not None
+
+        rng = random.Random(seed)
+        stop_event = threading.Event()
+        started = time.perf_counter()
+        sampler = threading.Thread(
+            target=sample_memory,
+            args=(stop_event, sample_interval, started, memory_samples),
+            daemon=True,
+        )
+        sampler.start()
+
+        # The converters report progress on stdout; keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()), \
+                ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = []
+            next_arrival = started
+            for index in range(requests):
+                if rate > 0:
+                    # Poisson arrivals at the requested rate
+                    next_arrival += rng.expovariate(rate)
+                    delay = next_arrival - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                futures.append(executor.submit(
+                    run_request, formats[index % len(formats)],
+                    corpus[index % len(corpus)], config, has_pdflatex, time.perf_counter(),
+                ))
+            results = [future.result() for future in futures]
+
+        elapsed = time.perf_counter() - started
+        stop_event.set()
+        sampler.join()
+
+    succeeded = [result for result in results if result['success']]
+    by_format = {}
+    for output_format in formats:
+        format_results = [result for result in succeeded if result['format'] == output_format]
+        by_format[output_format] = {
+            'requests': sum(1 for result in results if result['format'] == output_format),
+            'latency': summarize([result['latency'] for result in format_results]),
+        }
+
+    return {
+        'parameters': {
+            'requests': requests,
+            'concurrency': concurrency,
+            'rate': rate,
+            'formats': list(formats),
+            'corpus_size': corpus_size,
+            'stubbed_tools': stubbed,
+            'pandoc_latency': pandoc_latency if 'pandoc' in stubbed else None,
+            'pdflatex_latency': pdflatex_latency if 'pdflatex' in stubbed else None,
+            'latency_jitter': latency_jitter if stubbed else None,
+            'seed': seed,
+        },
+        'summary': {
+            'elapsed_s': round(elapsed, 3),
+            'succeeded': len(succeeded),
+            'failed': len(results) - len(succeeded),
+            'throughput_rps': round(len(succeeded) / elapsed, 3) if elapsed else None,
+            'latency': summarize([result['latency'] for result in succeeded]),
+            'queue_wait': summarize([result['queue_wait'] for result in results]),
+            'service': summarize([result['service'] for result in succeeded]),
+            'peak_self_rss_kb': max((s['self_kb'] for s in memory_samples), default=None),
+            'peak_total_rss_kb': max(
+                (s['self_kb'] + s['children_kb'] for s in memory_samples), default=None
+            ),
+            'by_format': by_format,
+        },
+        'memory_samples': memory_samples,
+    }
+
+
+def format_summary(report):
+    """Return a stable, diffable text summary of a load test report."""
+    lines = ["Markdown Converter Load Test", "=" * 40]
+    for key, value in report['parameters'].items():
+        lines.append(f"{key}: {value}")
+    lines.append("-" * 40)
+
+    summary = report['summary']
+    for key in ('elapsed_s', 'succeeded', 'failed', 'throughput_rps',
+                'peak_self_rss_kb', 'peak_total_rss_kb'):
+        lines.append(f"{key}: {summary[key]}")
+    for section in ('latency', 'queue_wait', 'service'):
+        stats = ' '.join(f"{name}={value}" for name, value in summary[section].items())
+        lines.append(f"{section}: {stats}")
+    for output_format, stats in summary['by_format'].items():
+        latency = ' '.join(f"{name}={value}" for name, value in stats['latency'].items())
+        lines.append(f"{output_format}: requests={stats['requests']} {latency}")
+    return '\n'.join(lines) + '\n'
+
+
+def generate_pathological_corpus(scale=1.0, seed=0):
+    """
+    Return {name: markdown_text} for machine-generated documents with
+    oversized tables and code blocks.
+
+    `scale` multiplies the row and line counts.
+    """
+    rng = random.Random(seed)
+    words = 'alpha beta gamma delta epsilon total pending shipped region north south'.split()
+
+    def count(base):
+        return max(1, int(base * scale))
+
+    def cell(length):
+        return ' '.join(rng.choice(words) for _ in range(length))
+
+    long_table = "# Long table\n\n| id | name | region | status | amount |\n|---|---|---|---|--:|\n"
+    long_table += ''.join(
+        f"| {row} | {cell(2)} | {rng.choice(words)} | {rng.choice(words)} | {rng.randint(0, 99999)} |\n"
+        for row in range(count(5000))
+    )
+
+    columns = 12
+    wide_table = "# Wide table\n\n|" + '|'.join(f" col{index} " for index in range(columns)) + "|\n"
+    wide_table += '|' + '---|' * columns + '\n'
+    wide_table += ''.join(
+        '|' + '|'.join(f" {cell(4)} " for _ in range(columns)) + '|\n'
+        for _ in range(count(1000))
+    )
+
+    long_code = "# Long code block\n\n```python\n" + ''.join(
+        f"result_{line} = transform(load('{rng.choice(words)}'), factor={rng.random():.6f})\n"
+        for line in range(count(20000))
+    ) + "```\n"
+
+    long_lines = "# Long lines\n\n```\n" + ''.join(
+        ','.join(str(rng.randint(0, 9999)) for _ in range(400)) + '\n'
+        for _ in range(count(300))
+    ) + "```\n"
+
+    return {
+        'long-table': long_table,
+        'wide-table': wide_table,
+        'long-code': long_code,
+        'long-lines': long_lines,
+    }
+
+
+def run_normalizer_benchmark(formats=('pdf', 'docx', 'latex'), scale=1.0, stub_tools=None,
+                             sample_interval=0.05, seed=0):
+    """
+    Convert a pathological corpus with and without the Markdown normalizer.
+
+    Each document is converted once per format with normalization disabled
+    and once with it enabled, one at a time, while the memory of the
+    pandoc/pdflatex child processes is sampled.
+
+    Returns:
+        dict: Parameters, per-run records and totals per format
+    """
+    corpus = generate_pathological_corpus(scale, seed)
+    config = get_default_config()
+    config['global']['auto_open_output'] = False
+    config['global']['save_markdown_source'] = False
+    config['catalog']['enabled'] = False
+    config['images']['enabled'] = False
+    # Measure the strategies meant for pathological input, not the lossless defaults
+    config['normalize'].update({
+        'pdf': {'tables': 'latex', 'long_lines': 'wrap'},
+        'docx': {'tables': 'docx', 'long_lines': 'wrap'},
+        'latex': {'tables': 'latex', 'long_lines': 'wrap'},
+    })
+
+    runs = []
+    with work_environment(stub_tools, 0, 0) as stubbed:
+        has_pdflatex = shutil.which('pdflatex') is not None
+        for name, markdown_text in corpus.items():
+            for output_format in formats:
+                for normalized in (False, True):
+                    config['normalize']['enabled'] = normalized
+                    samples = []
+                    stop_event = threading.Event()
+                    sampler = threading.Thread(
+                        target=sample_memory,
+                        args=(stop_event, sample_interval, time.perf_counter(), samples),
+                        daemon=True,
+                    )
+                    sampler.start()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        result = run_request(output_format, markdown_text, config,
+                                             has_pdflatex, time.perf_counter())
+                    stop_event.set()
+                    sampler.join()
+                    runs.append({
+                        'document': name,
+                        'format': output_format,
+                        'normalized': normalized,
+                        'success': result['success'],
+                        'seconds': round(result['service'], 3),
+                        'peak_children_kb': max((s['children_kb'] for s in samples), default=0),
+                    })
+
+    totals = {}
+    for output_format in formats:
+        format_runs = [run for run in runs if run['format'] == output_format]
+        before = [run for run in format_runs if not run['normalized']]
+        after = [run for run in format_runs if run['normalized']]
+        seconds_before = sum(run['seconds'] for run in before)
+        seconds_after = sum(run['seconds'] for run in after)
+        peak_before = max((run['peak_children_kb'] for run in before), default=0)
+        peak_after = max((run['peak_children_kb'] for run in after), default=0)
+        totals[output_format] = {
+            'seconds_before': round(seconds_before, 3),
+            'seconds_after': round(seconds_after, 3),
+            'seconds_saved': round(seconds_before - seconds_after, 3),
+            'peak_children_kb_before': peak_before,
+            'peak_children_kb_after': peak_after,
+            'peak_children_kb_saved': peak_before - peak_after,
+            'failed_before': sum(1 for run in before if not run['success']),
+            'failed_after': sum(1 for run in after if not run['success']),
+        }
+
+    return {
+        'parameters': {
+            'formats': list(formats),
+            'scale': scale,
+            'documents': {name: len(text.encode('utf-8')) for name, text in corpus.items()},
+            'stubbed_tools': stubbed,
+            'seed': seed,
+        },
+        'runs': runs,
+        'totals': totals,
+    }
+
+
+def format_benchmark_summary(report):
+    """Return a stable, diffable text summary of a normalizer benchmark report."""
+    lines = ["Markdown Normalizer Benchmark", "=" * 40]
+    for key, value in report['parameters'].items():
+        lines.append(f"{key}: {value}")
+    lines.append("-" * 40)
+    for run in report['runs']:
+        mode = 'normalized' if run['normalized'] else 'original'
+        status = 'ok' if run['success'] else 'FAILED'
+        lines.append(f"{run['document']} {run['format']} {mode}: {run['seconds']}s "
+                     f"peak_children_kb={run['peak_children_kb']} {status}")
+    lines.append("-" * 40)
+    for output_format, totals in report['totals'].items():
+        stats = ' '.join(f"{name}={value}" for name, value in totals.items())
+        lines.append(f"{output_format}: {stats}")
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv=None):
+    """Parse command-line arguments, run the load test and write the reports."""
+    parser = argparse.ArgumentParser(description="Load-test the Markdown converters.")
+    parser.add_argument('-n', '--requests', type=int, default=100)
+    parser.add_argument('-c', '--concurrency', type=int, default=4)
+    parser.add_argument('-r', '--rate', type=float, default=0.0,
+                        help="Arrival rate in requests/second (0 = all at once)")
+    parser.add_argument('-f', '--formats', default='pdf,docx,latex',
+                        help="Comma-separated output formats to cycle through")
+    parser.add_argument('--corpus-size', type=int, default=20)
+    stub_group = parser.add_mutually_exclusive_group()
+    stub_group.add_argument('--stub-tools', dest='stub_tools', action='store_true', default=None,
+                            help="Always use stand-in pandoc/pdflatex")
+    stub_group.add_argument('--real-tools', dest='stub_tools', action='store_false',
+                            help="Never use stand-in tools")
+    parser.add_argument('--pandoc-latency', type=float, default=0.05)
+    parser.add_argument('--pdflatex-latency', type=float, default=0.2)
+    parser.add_argument('--latency-jitter', type=float, default=0.0)
+    parser.add_argument('--sample-interval', type=float, default=0.25)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--pathological', action='store_true',
+                        help="Instead, compare conversions of oversized tables and code "
+                             "blocks with and without the Markdown normalizer")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Size multiplier for the --pathological corpus")
+    parser.add_argument('-o', '--output', default='load-test',
+                        help="Report path prefix; writes PREFIX.json and PREFIX.txt")
+    args = parser.parse_args(argv)
+
+    formats = tuple(name.strip() for name in args.formats.split(',') if name.strip())
+    invalid = [name for name in formats if name not in ('pdf', 'docx', 'latex')]
+    if invalid:
+        parser.error(f"unknown format(s): {', '.join(invalid)}")
+
+    if args.pathological:
+        report = run_normalizer_benchmark(formats=formats, scale=args.scale,
+                                          stub_tools=args.stub_tools, seed=args.seed)
+        summary = format_benchmark_summary(report)
+    else:
+        report = run_load_test(
+            requests=args.requests, concurrency=args.concurrency, rate=args.rate,
+            formats=formats, corpus_size=args.corpus_size, stub_tools=args.stub_tools,
+            pandoc_latency=args.pandoc_latency, pdflatex_latency=args.pdflatex_latency,
+            latency_jitter=args.latency_jitter, sample_interval=args.sample_interval,
+            seed=args.seed,
+        )
+        summary = format_summary(report)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(f"{args.output}.json", 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    with open(f"{args.output}.txt", 'w', encoding='utf-8') as f:
+        f.write(summary)
+
+    print(summary, end='')
+    print(f"Reports written to {args.output}.json and {args.output}.txt")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Markdown Normalizer - Tame oversized tables and code blocks before pandoc
+
+Machine-generated Markdown often contains pipe tables with thousands of rows
+and code blocks with thousands of very long lines. Pandoc turns such a
+table into a single longtable that pdflatex lays out over several passes
+while holding it in memory, and long code lines run off the page.
+
+normalize_markdown streams over the document line by line, leaves ordinary
+content alone and only rewrites tables and code blocks above the limits in
+the `normalize` section of markdown-converter.json. Tables are handled with
+one of these strategies, chosen per output format:
+
+- `split` (default): several smaller pipe tables, each repeating the header
+- `latex`: raw LaTeX `tabular` blocks that pandoc passes through without
+  parsing (PDF and LaTeX only)
+- `docx`: a native Word table written as raw OpenXML (DOCX only)
+- `keep`: leave the table unchanged
+
+Cells of `latex` and `docx` tables are copied as plain text, so inline
+Markdown in them is not rendered; they are opt-in. Code lines longer than
+`max_line_length` are kept unless `long_lines` is 'wrap' or 'truncate'. Code blocks longer than
+`max_code_lines` are cut short with a note, but only when that limit is
+set. Raw blocks such as ```{=latex} are passed through untouched.
+"""
+import re
+from xml.sax.saxutils import escape as escape_xml
+
+
+# Pipe table rows and the header separator below the first row
+TABLE_ROW_PATTERN = re.compile(r'^ {0,3}\|.*\|\s*$')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^ {0,3}\|(\s*:?-+:?\s*\|)+\s*$')
+CELL_SEPARATOR_PATTERN = re.compile(r'(?<!\\)\|')
+FENCE_PATTERN = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+# Raw blocks (```{=latex}, ```{=openxml}, ...) hold markup that must not be re-wrapped
+RAW_FENCE_PATTERN = re.compile(r'^ {0,3}(`{3,}|~{3,})\s*\{=[\w-]+\}\s*$')
+
+# Table strategies that produce valid output for each format
+TABLE_STRATEGIES = {
+    'pdf': ('split', 'latex', 'keep'),
+    'latex': ('split', 'latex', 'keep'),
+    'docx': ('split', 'docx', 'keep'),
+}
+
+LATEX_SPECIAL_CHARS = {
+    '\\': r'\textbackslash{}',
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+    '`': r'\textasciigrave{}',
+    '<': r'\textless{}',
+    '>': r'\textgreater{}',
+}
+LATEX_SPECIAL_PATTERN = re.compile('|'.join(re.escape(char) for char in LATEX_SPECIAL_CHARS))
+
+# Columns narrower than this (in characters, in total) fit the page as l/c/r columns
+LATEX_NATURAL_WIDTH = 80
+# Usable text width in twips (6.25in) for DOCX grid columns
+DOCX_TABLE_WIDTH = 9000
+
+
+def get_format_settings(normalize_config, output_format):
+    """Return the normalizer settings for `output_format` merged over the defaults."""
+    settings = {
+        'max_table_rows': 200,
+        'table_chunk_rows': 40,
+        'max_code_lines': 0,
+        'max_line_length': 120,
+        'tables': 'split',
+        'long_lines': 'keep',
+    }
+    for key in settings:
+        if key in normalize_config:
+            settings[key] = normalize_config[key]
+    settings.update(normalize_config.get(output_format, {}))
+    return settings
+
+
+class LineReader:
+    """An iterator over lines that allows one line to be pushed back."""
+
+    def __init__(self, lines):
+        self.lines = iter(lines)
+        self.pushed = []
+
+    def next(self):
+        """Return the next line, or None at the end of the input."""
+        if self.pushed:
+            return self.pushed.pop()
+        return next(self.lines, None)
+
+    def push_back(self, line):
+        self.pushed.append(line)
+
+
+def split_cells(row, columns=None):
+    """
+    Split a pipe table row into its cell texts.
+
+    Escaped pipes (`\\|`) stay in the cell. With `columns`, the result is
+    padded or truncated to that many cells.
+    """
+    row = row.strip()
+    if row.startswith('|'):
+        row = row[1:]
+    if row.endswith('|') and not row.endswith('\\|'):
+        row = row[:-1]
+    cells = [cell.strip().replace('\\|', '|') for cell in CELL_SEPARATOR_PATTERN.split(row)]
+    if columns is not None:
+        cells = (cells + [''] * columns)[:columns]
+    return cells
+
+
+def get_alignments(separator):
+    """Return 'left', 'center' or 'right' for each column of a separator row."""
+    alignments = []
+    for cell in split_cells(separator):
+        if cell.startswith(':') and cell.endswith(':'):
+            alignments.append('center')
+        elif cell.endswith(':'):
+            alignments.append('right')
+        else:
+            alignments.append('left')
+    return alignments
+
+
+def escape_latex(text):
+    """Escape LaTeX special characters in plain text."""
+    return LATEX_SPECIAL_PATTERN.sub(lambda match: LATEX_SPECIAL_CHARS[match.group(0)], text)
+
+
+def get_latex_column_spec(header, rows, alignments):
+    """
+    Return a tabular column specification for a chunk of rows.
+
+    Tables that fit the page keep their l/c/r alignment; wider ones get
+    paragraph columns sized in proportion to their longest cell.
+    """
+    widths = [max(len(row[column]) for row in [header] + rows) for column in range(len(header))]
+    if sum(widths) + 3 * len(widths) <= LATEX_NATURAL_WIDTH:
+        return '|' + '|'.join(alignment[0] for alignment in alignments) + '|'
+    widths = [max(width, 4) for width in widths]
+    total = sum(widths)
+    return '|' + '|'.join(f"p{{{0.9 * width / total:.3f}\\linewidth}}" for width in widths) + '|'
+
+
+def write_split_table(header, alignments, rows, settings):
+    """Yield an oversized table as several pipe tables, each repeating the header."""
+    separator = '|' + '|'.join({'left': '---', 'center': ':-:', 'right': '--:'}[alignment]
+                               for alignment in alignments) + '|\n'
+    header_line = '| ' + ' | '.join(cell.replace('|', '\\|') for cell in header) + ' |\n'
+    chunk_rows = max(1, settings['table_chunk_rows'])
+    count = 0
+    for row in rows:
+        if count % chunk_rows == 0:
+            if count:
+                yield '\n'
+            yield header_line
+            yield separator
+        yield '| ' + ' | '.join(cell.replace('|', '\\|') for cell in row) + ' |\n'
+        count += 1
+    yield '\n'
+
+
+def write_latex_chunk(header, alignments, rows):
+    """Yield one raw LaTeX tabular block for a chunk of rows."""
+    yield '```{=latex}\n'
+    yield '\\begin{center}\n'
+    yield f"\\begin{{tabular}}{{{get_latex_column_spec(header, rows, alignments)}}}\n"
+    yield '\\hline\n'
+    yield ' & '.join(f"\\textbf{{{escape_latex(cell)}}}" for cell in header) + ' \\\\\n'
+    yield '\\hline\n'
+    for row in rows:
+        yield ' & '.join(escape_latex(cell) for cell in row) + ' \\\\\n'
+    yield '\\hline\n'
+    yield '\\end{tabular}\n'
+    yield '\\end{center}\n'
+    yield '```\n'
+    yield '\n'
+
+
+def write_latex_table(header, alignments, rows, settings):
+    """
+    Yield an oversized table as raw LaTeX tabular blocks.
+
+    A tabular never breaks across pages, so the table is emitted in chunks
+    of `table_chunk_rows` rows that each fit on a page.
+    """
+    chunk_rows = max(1, settings['table_chunk_rows'])
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield from write_latex_chunk(header, alignments, chunk)
+            chunk = []
+    if chunk:
+        yield from write_latex_chunk(header, alignments, chunk)
+
+
+def get_docx_row(cells, alignments, header=False):
+    """Return one OpenXML table row."""
+    row_properties = '<w:trPr><w:tblHeader/></w:trPr>' if header else ''
+    run_properties = '<w:rPr><w:b/></w:rPr>' if header else ''
+    cells_xml = ''.join(
+        f'<w:tc><w:p><w:pPr><w:jc w:val="{alignment}"/></w:pPr>'
+        f'<w:r>{run_properties}<w:t xml:space="preserve">{escape_xml(cell)}</w:t></w:r></w:p></w:tc>'
+        for cell, alignment in zip(cells, alignments)
+    )
+    return f'<w:tr>{row_properties}{cells_xml}</w:tr>\n'
+
+
+def write_docx_table(header, alignments, rows, settings):
+    """
+    Yield an oversized table as a native Word table in a raw OpenXML block.
+
+    Word pages long tables itself, so the table is not split; its header
+    row repeats on every page.
+    """
+    column_width = DOCX_TABLE_WIDTH // max(1, len(header))
+    yield '```{=openxml}\n'
+    yield ('<w:tbl><w:tblPr><w:tblStyle w:val="Table"/><w:tblW w:type="pct" w:w="5000"/>'
+           '<w:tblLook w:firstRow="1" w:lastRow="0" w:firstColumn="0" w:lastColumn="0" '
+           'w:noHBand="0" w:noVBand="0" w:val="0020"/></w:tblPr>\n')
+    yield '<w:tblGrid>' + f'<w:gridCol w:w="{column_width}"/>' * len(header) + '</w:tblGrid>\n'
+    yield get_docx_row(header, alignments, header=True)
+    for row in rows:
+        yield get_docx_row(row, alignments)
+    yield '</w:tbl>\n'
+    yield '```\n'
+    yield '\n'
+
+
+TABLE_WRITERS = {
+    'split': write_split_table,
+    'latex': write_latex_table,
+    'docx': write_docx_table,
+}
+
+
+def normalize_table(header_line, separator_line, reader, settings):
+    """
+    Yield a pipe table unchanged, or rewritten if it has more than `max_table_rows` rows.
+
+    Only the first `max_table_rows` rows are buffered; the rest of an
+    oversized table is streamed through the writer.
+    """
+    rows = []
+    while len(rows) <= settings['max_table_rows']:
+        line = reader.next()
+        if line is None or not TABLE_ROW_PATTERN.match(line):
+            if line is not None:
+                reader.push_back(line)
+            yield header_line
+            yield separator_line
+            yield from rows
+            return
+        rows.append(line)
+
+    def remaining_rows():
+        yield from rows
+        while True:
+            line = reader.next()
+            if line is None or not TABLE_ROW_PATTERN.match(line):
+                if line is not None:
+                    reader.push_back(line)
+                return
+            yield line
+
+    if settings['tables'] == 'keep':
+        yield header_line
+        yield separator_line
+        yield from remaining_rows()
+        return
+
+    header = split_cells(header_line)
+    alignments = (get_alignments(separator_line) + ['left'] * len(header))[:len(header)]
+    cells = (split_cells(line, len(header)) for line in remaining_rows())
+    yield from TABLE_WRITERS[settings['tables']](header, alignments, cells, settings)
+
+
+def fit_line(line, settings):
+    """Yield a code line wrapped or truncated to `max_line_length`."""
+    max_length = settings['max_line_length']
+    text = line.rstrip('\n')
+    if not max_length or len(text) <= max_length or settings['long_lines'] == 'keep':
+        yield line
+    elif settings['long_lines'] == 'truncate':
+        yield text[:max(1, max_length - 3)] + '...\n'
+    else:
+        for start in range(0, len(text), max_length):
+            yield text[start:start + max_length] + '\n'
+
+
+def normalize_code_block(opening_line, fence, reader, settings):
+    """
+    Yield a fenced code block with long lines fitted and excess lines omitted.
+
+    Raw blocks are yielded unchanged.
+    """
+    closing_pattern = re.compile(rf'^ {{0,3}}{re.escape(fence[0])}{{{len(fence)},}}\s*$')
+    if RAW_FENCE_PATTERN.match(opening_line):
+        yield opening_line
+        while True:
+            line = reader.next()
+            if line is None:
+                return
+            yield line
+            if closing_pattern.match(line):
+                return
+
+    max_lines = settings['max_code_lines']
+    count = 0
+    omitted = 0
+    yield opening_line
+    while True:
+        line = reader.next()
+        if line is None or closing_pattern.match(line):
+            break
+        count += 1
+        if max_lines and count > max_lines:
+            omitted += 1
+            continue
+        yield from fit_line(line, settings)
+    if omitted:
+        yield f"... {omitted} more lines omitted ...\n"
+    if line is not None:
+        yield line
+
+
+def normalize_lines(lines, settings):
+    """Yield normalized Markdown lines for an iterable of lines (with line endings)."""
+    reader = LineReader(lines)
+    while True:
+        line = reader.next()
+        if line is None:
+            return
+        fence = FENCE_PATTERN.match(line)
+        if fence:
+            yield from normalize_code_block(line, fence.group(1), reader, settings)
+            continue
+        if TABLE_ROW_PATTERN.match(line):
+            separator = reader.next()
+            if separator is not None and TABLE_SEPARATOR_PATTERN.match(separator):
+                yield from normalize_table(line, separator, reader, settings)
+                continue
+            if separator is not None:
+                reader.push_back(separator)
+        yield line
+
+
+def normalize_markdown(markdown_text, output_format, config):
+    """
+    Rewrite oversized tables and code blocks in `markdown_text` for `output_format`.
+
+    Args:
+        markdown_text: String containing markdown content
+        output_format: One of 'pdf', 'docx' or 'latex'
+        config: Full configuration dict
+
+    Returns:
+        str: Markdown text ready for pandoc
+    """
+    normalize_config = config.get('normalize', {})
+    if not normalize_config.get('enabled', True):
+        return markdown_text
+
+    settings = get_format_settings(normalize_config, output_format)
+    valid = TABLE_STRATEGIES.get(output_format, ('split', 'keep'))
+    if settings['tables'] not in valid:
+        print(f"Warning: table strategy '{settings['tables']}' is not available for "
+              f"{output_format}; splitting tables instead.")
+        settings['tables'] = 'split'
+
+    return ''.join(normalize_lines(markdown_text.splitlines(keepends=True), settings))
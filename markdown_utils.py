@@ -12,23 +12,60 @@ import subprocess
 import datetime
 import json
 import re
+import threading
+import contextvars
 
 
-def get_unique_filename(basename):
+# Environment for the external tools a job runs; the warm daemon sets it to
+# its client's environment, and None means os.environ
+_tool_environment = contextvars.ContextVar('tool_environment', default=None)
+
+# Filenames handed out by get_unique_filename in this process and not yet
+# released; lets concurrent conversions pick names before their output files exist
+_reserved_filenames = set()
+_filename_lock = threading.Lock()
+
+
+def set_tool_environment(env):
+    """Run the external tools of the current job (and context) with `env`."""
+    _tool_environment.set(env)
+
+
+def get_tool_environment():
+    """Return a copy of the environment external tools should run with."""
+    env = _tool_environment.get()
+    return dict(os.environ if env is None else env)
+
+
+def get_unique_filename(basename, start_index=0):
     """
     Generate a filename that does not overwrite existing files.
     E.g., for basename 'PDF/20250525HelloWorld.pdf', returns
     'PDF/20250525HelloWorld.pdf' or 'PDF/20250525HelloWorld-1.pdf', etc.
+    Candidates before suffix `start_index` are skipped.
     """
     base, ext = os.path.splitext(basename)
-    filename = basename
-    index = 1
-    while os.path.exists(filename):
-        filename = f"{base}-{index}{ext}"
-        index += 1
+    filename = basename if start_index == 0 else f"{base}-{start_index}{ext}"
+    index = max(1, start_index + 1)
+    with _filename_lock:
+        while os.path.exists(filename) or filename in _reserved_filenames:
+            filename = f"{base}-{index}{ext}"
+            index += 1
+        _reserved_filenames.add(filename)
     return filename
 
 
+def release_filename(filename):
+    """
+    Release a name reserved by get_unique_filename.
+
+    Call this once the output file has been written (or the conversion has
+    given up), so long-running processes do not accumulate reservations.
+    """
+    with _filename_lock:
+        _reserved_filenames.discard(filename)
+
+
 def check_pandoc():
     """Check if pandoc is available."""
     if shutil.which('pandoc') is None:
@@ -75,8 +112,13 @@ def get_snippet_slug(text, num_words=6):
     return ''.join(word.capitalize() for word in snippet_words)
 
 
-def get_dated_filename(output_dir, extension, markdown_text=None, custom_slug=None):
-    """Generate a date-based filename with an optional custom slug."""
+def get_dated_filename(output_dir, extension, markdown_text=None, custom_slug=None, catalog=None):
+    """
+    Generate a date-based filename with an optional custom slug.
+
+    If an output catalog connection is given, the search for a free `-N`
+    suffix starts after the highest suffix recorded for that name.
+    """
     today_str = datetime.date.today().strftime('%Y%m%d')
 
     if custom_slug:
@@ -87,16 +129,23 @@ def get_dated_filename(output_dir, extension, markdown_text=None, custom_slug=No
     base_name = f"{today_str}{slug}"
 
     default_file = os.path.join(output_dir, f"{base_name}.{extension}")
-    return get_unique_filename(default_file)
+    start_index = 0
+    if catalog is not None and os.path.exists(default_file):
+        # Imported here so thin daemon clients do not load sqlite3
+        from output_catalog import get_next_suffix
+        start_index = get_next_suffix(catalog, output_dir, base_name, extension)
+    return get_unique_filename(default_file, start_index)
 
 
-def save_markdown_file(markdown_text, output_file_path):
+def save_markdown_file(markdown_text, output_file_path, config=None):
     """
     Save the input markdown text as a .md file with the same base name as the output file.
     
     Args:
         markdown_text: String containing the markdown content
         output_file_path: Path to the converted output file (e.g., 'PDF/20250525HelloWorld.pdf')
+        config: Optional configuration dict; if its source store is enabled the
+            file is linked to a deduplicated copy (see source_store.py)
         
     Returns:
         str: Path to the saved markdown file
@@ -105,6 +154,14 @@ def save_markdown_file(markdown_text, output_file_path):
     base_path = os.path.splitext(output_file_path)[0]
     md_filename = f"{base_path}.md"
     
+    store_config = (config or {}).get('global', {}).get('source_store', {})
+    if store_config.get('enabled'):
+        try:
+            from source_store import store_markdown_source
+            return store_markdown_source(markdown_text, output_file_path, store_config)
+        except Exception as e:
+            print(f"Warning: Source store unavailable ({e}); saving a plain copy.")
+
     try:
         with open(md_filename, 'w', encoding='utf-8') as f:
             f.write(markdown_text)
@@ -114,26 +171,28 @@ def save_markdown_file(markdown_text, output_file_path):
         return None
 
 
-def run_pandoc(command_args, markdown_text):
+def run_pandoc(command_args, markdown_text, cwd=None):
     """
     Run pandoc with the given command arguments and markdown input.
     
     Args:
         command_args: List of pandoc command arguments
         markdown_text: String containing markdown content
+        cwd: Directory to run pandoc in (default: current directory)
         
     Returns:
         bool: True if pandoc succeeded, False otherwise.
     """
     try:
-        # Set TMPDIR to current directory for pandoc temp files
-        env = os.environ.copy()
-        env['TMPDIR'] = os.getcwd()
+        # Set TMPDIR to the working directory for pandoc temp files
+        env = get_tool_environment()
+        env['TMPDIR'] = cwd or os.getcwd()
 
         result = subprocess.run(
             command_args,
             input=markdown_text.encode('utf-8'),
             env=env,
+            cwd=cwd,
             capture_output=True
         )
 
@@ -149,13 +208,16 @@ def run_pandoc(command_args, markdown_text):
         return False
 
 
-def run_pdflatex(tex_file, output_dir):
+def run_pdflatex(tex_file, output_dir, cwd=None, search_dirs=None):
     """
     Run pdflatex to compile a .tex file to PDF.
     
     Args:
         tex_file: Path to the .tex file
         output_dir: Directory for output files
+        cwd: Directory to run pdflatex in (default: current directory)
+        search_dirs: Directories searched for inputs and images before the
+            usual TEXINPUTS path
         
     Returns:
         tuple: (success: bool, pdf_file: str or None)
@@ -163,12 +225,18 @@ def run_pdflatex(tex_file, output_dir):
     pdf_file = os.path.splitext(tex_file)[0] + ".pdf"
     
     try:
-        env = os.environ.copy()
-        env['TMPDIR'] = os.getcwd()
+        env = get_tool_environment()
+        env['TMPDIR'] = cwd or os.getcwd()
+        if search_dirs:
+            # The trailing separator keeps TeX's default search path
+            env['TEXINPUTS'] = os.pathsep.join(
+                [os.path.abspath(path) for path in search_dirs] + [env.get('TEXINPUTS', '')]
+            )
 
         result = subprocess.run(
             ['pdflatex', '-interaction=nonstopmode', f'-output-directory={output_dir}', tex_file],
             env=env,
+            cwd=cwd,
             capture_output=True
         )
 
@@ -212,7 +280,16 @@ def get_default_config():
         "global": {
             "save_markdown_source": True,
             "auto_open_output": True,
-            "output_naming": "date"
+            "output_naming": "date",
+            "source_store": {
+                "enabled": False,
+                "dir": "~/.markdown-converter/sources",
+                "compression": "none"
+            }
+        },
+        "catalog": {
+            "enabled": True,
+            "path": "~/.markdown-converter/catalog.sqlite3"
         },
         "pdf": {
             "geometry": {
@@ -241,6 +318,43 @@ def get_default_config():
             },
             "document_class": "article",
             "compile_pdf": True
+        },
+        "optimize": {
+            "workers": 4,
+            "pdf": {
+                "enabled": False,
+                "linearize": True,
+                "ghostscript": False
+            },
+            "docx": {
+                "enabled": False,
+                "dedupe_media": True
+            }
+        },
+        "bibliography": {
+            "files": [],
+            "csl": None,
+            "prune": True,
+            "cache_dir": "~/.markdown-converter/cache/bibliography"
+        },
+        "normalize": {
+            "enabled": True,
+            "max_table_rows": 200,
+            "table_chunk_rows": 40,
+            "max_code_lines": 0,
+            "max_line_length": 120,
+            "pdf": {"tables": "split", "long_lines": "keep"},
+            "docx": {"tables": "split", "long_lines": "keep"},
+            "latex": {"tables": "split", "long_lines": "keep"}
+        },
+        "images": {
+            "enabled": True,
+            "cache_dir": "~/.markdown-converter/cache/images",
+            "workers": 4,
+            "max_width_in": 6.5,
+            "jpeg_quality": 85,
+            "pdf": {"dpi": 300},
+            "docx": {"dpi": 150}
         }
     }
 
@@ -255,12 +369,12 @@ def deep_merge(base, override):
     return base
 
 
-def load_config():
+def load_config(config_dir=None):
     """
     Load configuration from file with fallback to defaults.
     
     Searches for config files in this order:
-    1. ./markdown-converter.json (current directory)
+    1. ./markdown-converter.json (current directory, or `config_dir`)
     2. ~/markdown-converter.json (home directory)
     3. Default configuration (built-in)
     
@@ -271,7 +385,7 @@ def load_config():
     
     # Look for configuration in the current directory first, then the home directory
     config_paths = [
-        "./markdown-converter.json",
+        os.path.join(config_dir or ".", "markdown-converter.json"),
         os.path.expanduser("~/markdown-converter.json")
     ]
     
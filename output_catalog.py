@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Output Catalog - SQLite record of every conversion
+
+Each conversion is recorded with its timestamp, source hash, slug, format,
+effective pandoc arguments, output paths, sizes and stage timings. The
+Markdown sources are indexed with SQLite FTS5 so past outputs can be found
+by their content:
+
+    python output_catalog.py search "quarterly revenue"
+    python output_catalog.py list --format pdf --since 2025-03-01 --until 2025-03-31
+    python output_catalog.py source notes.md
+    python output_catalog.py show 42
+
+The catalog also lets get_dated_filename find the next free `-N` suffix
+with an index lookup instead of probing the filesystem name by name.
+"""
+import os
+import json
+import sqlite3
+import hashlib
+import argparse
+import datetime
+import threading
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversions (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    slug TEXT,
+    format TEXT NOT NULL,
+    pandoc_args TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    extra_outputs TEXT NOT NULL DEFAULT '[]',
+    markdown_path TEXT,
+    output_dir TEXT NOT NULL,
+    base_name TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    suffix INTEGER NOT NULL DEFAULT 0,
+    source_bytes INTEGER NOT NULL,
+    output_bytes INTEGER NOT NULL,
+    timings TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS conversions_source_hash ON conversions (source_hash);
+CREATE INDEX IF NOT EXISTS conversions_created_at ON conversions (created_at);
+CREATE INDEX IF NOT EXISTS conversions_name
+    ON conversions (output_dir, base_name, extension, suffix);
+
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    source_hash TEXT NOT NULL UNIQUE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS sources_fts USING fts5 (body);
+"""
+
+# One connection per catalog file, shared by all threads in the process
+_connections = {}
+_catalog_lock = threading.RLock()
+
+
+def get_catalog_path(catalog_config):
+    """Return the expanded catalog database path."""
+    return os.path.expanduser(catalog_config.get('path', '~/.markdown-converter/catalog.sqlite3'))
+
+
+def connect(path):
+    """
+    Open (and if needed create) the catalog at `path`.
+
+    Returns:
+        sqlite3.Connection: Connection shared by every caller in this process
+    """
+    path = os.path.abspath(path)
+    with _catalog_lock:
+        if path not in _connections:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            _connections[path] = conn
+        return _connections[path]
+
+
+def open_catalog(config):
+    """
+    Return the catalog connection for `config`, or None if the catalog is disabled.
+    """
+    catalog_config = config.get('catalog', {})
+    if not catalog_config.get('enabled', False):
+        return None
+    try:
+        return connect(get_catalog_path(catalog_config))
+    except sqlite3.Error as e:
+        print(f"Warning: Failed to open output catalog: {e}")
+        return None
+
+
+def get_source_hash(markdown_text):
+    """Return the SHA-256 hex digest of `markdown_text`."""
+    return hashlib.sha256(markdown_text.encode('utf-8')).hexdigest()
+
+
+def split_output_name(output_path):
+    """
+    Split an output path into (output_dir, base_name, extension, suffix).
+
+    E.g. 'PDF/20250525Hello-3.pdf' -> ('PDF', '20250525Hello', 'pdf', 3)
+    """
+    output_dir, filename = os.path.split(output_path)
+    stem, ext = os.path.splitext(filename)
+    base_name, sep, index = stem.rpartition('-')
+    if sep and index.isdigit():
+        return output_dir, base_name, ext.lstrip('.'), int(index)
+    return output_dir, stem, ext.lstrip('.'), 0
+
+
+def get_next_suffix(catalog, output_dir, base_name, extension):
+    """
+    Return the first `-N` suffix after the highest one recorded for a name.
+
+    Returns:
+        int: 0 if the name was never recorded, otherwise max suffix + 1
+    """
+    with _catalog_lock:
+        row = catalog.execute(
+            "SELECT MAX(suffix) FROM conversions "
+            "WHERE output_dir = ? AND base_name = ? AND extension = ?",
+            (os.path.abspath(output_dir), base_name, extension),
+        ).fetchone()
+    return 0 if row[0] is None else row[0] + 1
+
+
+def record_conversion(catalog, output_format, markdown_text, slug, pandoc_args,
+                      output_path, extra_outputs=None, markdown_path=None, timings=None):
+    """
+    Record a conversion in the catalog. Conversions whose output was not
+    created are not recorded.
+
+    Returns:
+        int or None: Row id of the recorded conversion
+    """
+    if catalog is None or not os.path.exists(output_path):
+        return None
+
+    source_hash = get_source_hash(markdown_text)
+    output_dir, base_name, extension, suffix = split_output_name(output_path)
+    output_bytes = os.path.getsize(output_path)
+
+    try:
+        with _catalog_lock, catalog:
+            source = catalog.execute(
+                "SELECT id FROM sources WHERE source_hash = ?", (source_hash,)
+            ).fetchone()
+            if source is None:
+                source_id = catalog.execute(
+                    "INSERT INTO sources (source_hash) VALUES (?)", (source_hash,)
+                ).lastrowid
+                catalog.execute(
+                    "INSERT INTO sources_fts (rowid, body) VALUES (?, ?)",
+                    (source_id, markdown_text),
+                )
+
+            return catalog.execute(
+                "INSERT INTO conversions (created_at, source_hash, slug, format, pandoc_args, "
+                "output_path, extra_outputs, markdown_path, output_dir, base_name, extension, "
+                "suffix, source_bytes, output_bytes, timings) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    datetime.datetime.now().isoformat(timespec='seconds'),
+                    source_hash, slug, output_format, json.dumps(pandoc_args),
+                    os.path.abspath(output_path),
+                    json.dumps([os.path.abspath(path) for path in extra_outputs or []]),
+                    os.path.abspath(markdown_path) if markdown_path else None,
+                    os.path.abspath(output_dir), base_name, extension, suffix,
+                    len(markdown_text.encode('utf-8')), output_bytes,
+                    json.dumps({stage: round(seconds, 4) for stage, seconds in (timings or {}).items()}),
+                ),
+            ).lastrowid
+    except sqlite3.Error as e:
+        print(f"Warning: Failed to record conversion in catalog: {e}")
+        return None
+
+
+CONVERSION_COLUMNS = (
+    'id', 'created_at', 'format', 'slug', 'output_path', 'output_bytes', 'source_hash', 'timings'
+)
+
+
+def search_sources(catalog, query, limit=20):
+    """Return conversions whose Markdown source matches the FTS5 `query`, best first."""
+    with _catalog_lock:
+        return catalog.execute(
+            f"SELECT {', '.join('c.' + column for column in CONVERSION_COLUMNS)}, "
+            "snippet(sources_fts, 0, '[', ']', '...', 8) AS snippet "
+            "FROM sources_fts JOIN sources s ON s.id = sources_fts.rowid "
+            "JOIN conversions c ON c.source_hash = s.source_hash "
+            "WHERE sources_fts MATCH ? ORDER BY sources_fts.rank, c.created_at DESC LIMIT ?",
+            (query, limit),
+        ).fetchall()
+
+
+def list_conversions(catalog, output_format=None, since=None, until=None, slug=None,
+                     source_hash=None, limit=50):
+    """Return conversions matching the given filters, newest first."""
+    clauses, params = [], []
+    if output_format:
+        clauses.append("format = ?")
+        params.append(output_format)
+    if since:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until:
+        # Dates without a time include the whole day
+        clauses.append("created_at < ?")
+        params.append(until + 'T99' if len(until) == 10 else until)
+    if slug:
+        clauses.append("slug LIKE ?")
+        params.append(f"%{slug}%")
+    if source_hash:
+        clauses.append("source_hash = ?")
+        params.append(source_hash)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _catalog_lock:
+        return catalog.execute(
+            f"SELECT {', '.join(CONVERSION_COLUMNS)} FROM conversions {where} "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+
+
+def get_conversion(catalog, conversion_id):
+    """Return a single conversion row with all columns, or None."""
+    with _catalog_lock:
+        return catalog.execute(
+            "SELECT * FROM conversions WHERE id = ?", (conversion_id,)
+        ).fetchone()
+
+
+def print_rows(rows):
+    """Print conversion rows as one line each."""
+    for row in rows:
+        print(f"{row['id']:>6}  {row['created_at']}  {row['format']:<5}  {row['output_path']}")
+        if 'snippet' in row.keys():
+            print(f"        {' '.join(row['snippet'].split())}")
+    if not rows:
+        print("No matching conversions.")
+
+
+def main(argv=None):
+    """Command-line interface for querying the catalog."""
+    # Imported here so the catalog itself has no dependency on markdown_utils
+    from markdown_utils import load_config
+
+    parser = argparse.ArgumentParser(description="Query the conversion catalog.")
+    parser.add_argument('--db', help="Catalog path (default: from markdown-converter.json)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    search_parser = subparsers.add_parser('search', help="Full-text search over saved sources")
+    search_parser.add_argument('query', help="FTS5 query, e.g. 'revenue AND march'")
+    search_parser.add_argument('-n', '--limit', type=int, default=20)
+
+    list_parser = subparsers.add_parser('list', help="List conversions")
+    list_parser.add_argument('--format', choices=['pdf', 'docx', 'latex'])
+    list_parser.add_argument('--since', help="Start date, e.g. 2025-03-01")
+    list_parser.add_argument('--until', help="End date (inclusive), e.g. 2025-03-31")
+    list_parser.add_argument('--slug', help="Substring of the slug")
+    list_parser.add_argument('-n', '--limit', type=int, default=50)
+
+    source_parser = subparsers.add_parser('source', help="Find conversions of a Markdown file")
+    source_parser.add_argument('markdown_file')
+
+    show_parser = subparsers.add_parser('show', help="Show every recorded field of a conversion")
+    show_parser.add_argument('id', type=int)
+
+    args = parser.parse_args(argv)
+    catalog = connect(args.db or get_catalog_path(load_config().get('catalog', {})))
+
+    if args.command == 'search':
+        try:
+            print_rows(search_sources(catalog, args.query, args.limit))
+        except sqlite3.OperationalError as e:
+            print(f"Error: invalid search query: {e}")
+    elif args.command == 'list':
+        print_rows(list_conversions(catalog, args.format, args.since, args.until,
+                                    args.slug, limit=args.limit))
+    elif args.command == 'source':
+        # Conversions hash the sanitized text, so sanitize the same way
+        from markdown_utils import sanitize_text
+        with open(args.markdown_file, 'r', encoding='utf-8') as f:
+            source_hash = get_source_hash(sanitize_text(f.read()))
+        print_rows(list_conversions(catalog, source_hash=source_hash))
+    else:
+        row = get_conversion(catalog, args.id)
+        if row is None:
+            print(f"No conversion with id {args.id}.")
+        else:
+            for key in row.keys():
+                print(f"{key}: {row[key]}")
+
+
+if __name__ == '__main__':
+    main()
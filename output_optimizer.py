@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Output Optimizer - Smaller, faster-loading PDF and DOCX files
+
+PDFs are rewritten with qpdf to compress object streams and, optionally,
+linearize them for fast first-page display over the web. With
+`ghostscript` enabled they are first passed through Ghostscript, which
+removes duplicate fonts and images (this re-renders the PDF, so it is off
+by default).
+
+DOCX files are repacked with maximum deflate compression, and identical
+media files are stored once with their relationships updated.
+
+Optimization is configured per format in the `optimize` section of
+markdown-converter.json. Existing outputs can be optimized in bulk:
+
+    python output_optimizer.py PDF/*.pdf DOCX/*.docx --workers 8
+"""
+import os
+import re
+import sys
+import shutil
+import hashlib
+import zipfile
+import argparse
+import posixpath
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from markdown_utils import load_config, get_tool_environment
+
+
+def optimize_pdf(path, temp_path, pdf_config):
+    """
+    Write an optimized copy of the PDF at `path` to `temp_path`.
+
+    Returns:
+        bool: True if `temp_path` was written, False if no tool was available
+    """
+    source = path
+    gs_path = f"{temp_path}.gs.pdf"
+    env = get_tool_environment()
+    try:
+        if pdf_config.get('ghostscript', False) and shutil.which('gs', path=env.get('PATH')):
+            result = subprocess.run(
+                ['gs', '-q', '-dNOPAUSE', '-dBATCH', '-dSAFER', '-sDEVICE=pdfwrite',
+                 '-dDetectDuplicateImages=true', '-dCompressFonts=true', '-dSubsetFonts=true',
+                 '-dPDFSETTINGS=/default', f'-sOutputFile={gs_path}', path],
+                env=env,
+                capture_output=True
+            )
+            if result.returncode == 0 and os.path.exists(gs_path):
+                source = gs_path
+
+        if shutil.which('qpdf', path=env.get('PATH')) is None:
+            if source == gs_path:
+                os.replace(gs_path, temp_path)
+                return True
+            return False
+
+        command = ['qpdf', '--object-streams=generate', '--compress-streams=y',
+                   '--recompress-flate', '--compression-level=9']
+        if pdf_config.get('linearize', True):
+            command.append('--linearize')
+        result = subprocess.run(command + [source, temp_path], env=env, capture_output=True)
+        # qpdf exits with 3 for warnings but still writes the file
+        return result.returncode in (0, 3) and os.path.exists(temp_path)
+    finally:
+        if os.path.exists(gs_path):
+            os.remove(gs_path)
+
+
+def get_duplicate_media(archive):
+    """
+    Find media files in a DOCX archive whose content duplicates another.
+
+    Returns:
+        dict: Duplicate entry name -> name of the identical entry that is kept
+    """
+    first_by_hash = {}
+    duplicates = {}
+    for info in archive.infolist():
+        if not info.filename.startswith('word/media/'):
+            continue
+        digest = hashlib.sha256(archive.read(info)).hexdigest()
+        if digest in first_by_hash:
+            duplicates[info.filename] = first_by_hash[digest]
+        else:
+            first_by_hash[digest] = info.filename
+    return duplicates
+
+
+def rewrite_relationships(rels_name, data, duplicates):
+    """Point relationship targets at kept media instead of removed duplicates."""
+    # Targets are relative to the directory that holds the _rels folder
+    base_dir = posixpath.dirname(posixpath.dirname(rels_name))
+    text = data.decode('utf-8')
+
+    def replace(match):
+        target = match.group(2)
+        resolved = posixpath.normpath(posixpath.join(base_dir, target))
+        if resolved not in duplicates:
+            return match.group(0)
+        new_target = posixpath.relpath(duplicates[resolved], base_dir or '.')
+        return f'{match.group(1)}{new_target}{match.group(3)}'
+
+    return re.sub(r'(Target=")([^"]+)(")', replace, text).encode('utf-8')
+
+
+def remove_content_type_overrides(data, duplicates):
+    """Drop the [Content_Types].xml overrides of removed duplicate parts."""
+    removed = {'/' + name for name in duplicates}
+
+    def replace(match):
+        return '' if match.group(1) in removed else match.group(0)
+
+    text = data.decode('utf-8')
+    return re.sub(r'<Override\s[^>]*?PartName="([^"]+)"[^>]*?/>', replace, text).encode('utf-8')
+
+
+def optimize_docx(path, temp_path, docx_config):
+    """
+    Write a repacked, media-deduplicated copy of the DOCX at `path` to `temp_path`.
+
+    Returns:
+        bool: True if `temp_path` was written
+    """
+    with zipfile.ZipFile(path) as archive:
+        duplicates = get_duplicate_media(archive) if docx_config.get('dedupe_media', True) else {}
+        with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as output:
+            for info in archive.infolist():
+                if info.filename in duplicates:
+                    continue
+                data = archive.read(info)
+                if duplicates and info.filename.endswith('.rels'):
+                    data = rewrite_relationships(info.filename, data, duplicates)
+                elif duplicates and info.filename == '[Content_Types].xml':
+                    data = remove_content_type_overrides(data, duplicates)
+                entry = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                entry.external_attr = info.external_attr
+                # Already-compressed media gains nothing from deflate
+                if info.filename.startswith('word/media/') and \
+                        info.filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
+                    entry.compress_type = zipfile.ZIP_STORED
+                else:
+                    entry.compress_type = zipfile.ZIP_DEFLATED
+                output.writestr(entry, data, compresslevel=9)
+    return True
+
+
+OPTIMIZERS = {
+    'pdf': optimize_pdf,
+    'docx': optimize_docx,
+}
+
+
+def optimize_output(path, config):
+    """
+    Optimize an output file in place if its format is enabled in `config`.
+
+    The optimized file replaces the original only if it is smaller, or for
+    PDFs if linearization was requested.
+
+    Returns:
+        dict or None: {'path', 'before', 'after', 'saved'}, or None if skipped
+    """
+    output_format = os.path.splitext(path)[1].lstrip('.').lower()
+    format_config = config.get('optimize', {}).get(output_format, {})
+    if output_format not in OPTIMIZERS or not format_config.get('enabled', False):
+        return None
+    if not os.path.exists(path):
+        return None
+
+    before = os.path.getsize(path)
+    temp_path = f"{path}.{os.getpid()}.optimizing"
+    try:
+        if not OPTIMIZERS[output_format](path, temp_path, format_config):
+            return None
+        after = os.path.getsize(temp_path)
+        keep = after < before or (output_format == 'pdf' and format_config.get('linearize', True))
+        if not keep:
+            return {'path': path, 'before': before, 'after': before, 'saved': 0}
+        shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+        return {'path': path, 'before': before, 'after': after, 'saved': before - after}
+    except Exception as e:
+        print(f"Warning: Failed to optimize {path}: {e}")
+        return None
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def optimize_outputs(paths, config, workers=None):
+    """
+    Optimize several output files in a worker pool.
+
+    Returns:
+        list: Result dicts from optimize_output for the files that were optimized
+    """
+    workers = workers or config.get('optimize', {}).get('workers') or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda path: optimize_output(path, config), paths))
+    return [result for result in results if result]
+
+
+def report_saving(result):
+    """Print the size change of an optimize_output result, if any."""
+    if not result or not result['saved']:
+        return
+    if result['saved'] > 0:
+        percent = 100 * result['saved'] / result['before'] if result['before'] else 0
+        print(f"🗜️  Optimized {result['path']}: saved {result['saved']} bytes ({percent:.1f}%)")
+    else:
+        # Linearization can add a few bytes; it is kept for faster display
+        print(f"🗜️  Linearized {result['path']}: {-result['saved']} bytes larger")
+
+
+def main(argv=None):
+    """Optimize existing PDF and DOCX files."""
+    parser = argparse.ArgumentParser(description="Optimize PDF and DOCX outputs in place.")
+    parser.add_argument('files', nargs='+', help="PDF and DOCX files to optimize")
+    parser.add_argument('-w', '--workers', type=int, help="Files optimized in parallel")
+    parser.add_argument('--no-linearize', dest='linearize', action='store_false',
+                        help="Only keep PDF rewrites that are smaller")
+    parser.add_argument('--ghostscript', action='store_true',
+                        help="Deduplicate PDF fonts and images with Ghostscript")
+    args = parser.parse_args(argv)
+
+    # Explicitly listed files are optimized regardless of the enabled flags
+    config = load_config()
+    optimize_config = config.setdefault('optimize', {})
+    optimize_config.setdefault('pdf', {}).update(
+        {'enabled': True, 'linearize': args.linearize, 'ghostscript': args.ghostscript}
+    )
+    optimize_config.setdefault('docx', {})['enabled'] = True
+    if shutil.which('qpdf') is None and any(path.lower().endswith('.pdf') for path in args.files):
+        print("Warning: qpdf not found; PDFs will not be optimized.", file=sys.stderr)
+
+    results = optimize_outputs(args.files, config, args.workers)
+    for result in results:
+        report_saving(result)
+    before = sum(result['before'] for result in results)
+    saved = sum(result['saved'] for result in results)
+    change = f"saved {saved} bytes" if saved >= 0 else f"{-saved} bytes larger after linearization"
+    print(f"Optimized {len(results)} file(s): {before} -> {before - saved} bytes ({change}).")
+
+
+if __name__ == '__main__':
+    main()
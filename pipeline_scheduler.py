@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Pipeline Scheduler - Two-stage batch conversion to LaTeX and PDF
+
+convert_to_latex runs pandoc and then pdflatex for one document at a time.
+Pandoc is memory-heavy while pdflatex is CPU- and IO-heavy, so running a
+batch that way leaves one of them idle. This scheduler runs the pandoc stage
+and the TeX stage in separate, independently sized worker pools connected
+by a bounded queue.
+
+Each job's cost is predicted from its size and features (tables, math, code
+blocks, images) and the most expensive jobs are dispatched first, which
+shortens the time until the whole batch is done. The TeX stage can also
+adapt its concurrency to the system load average.
+
+    python pipeline_scheduler.py docs/*.md --pandoc-workers 2 --tex-workers 4
+"""
+import os
+import re
+import copy
+import time
+import queue
+import argparse
+import threading
+
+import MarkdownConverter
+from markdown_utils import check_pandoc, check_pdflatex, load_config
+
+
+# Relative cost of each feature, in units of one byte of plain text
+COST_WEIGHTS = {
+    'pandoc': {'bytes': 1.0, 'table_rows': 40.0, 'math': 20.0, 'code_lines': 5.0, 'images': 200.0},
+    'tex': {'bytes': 1.0, 'table_rows': 150.0, 'math': 120.0, 'code_lines': 25.0, 'images': 2000.0},
+}
+# Fixed per-document overhead, mostly process start-up
+COST_BASE = {'pandoc': 2000.0, 'tex': 20000.0}
+
+FENCE_PATTERN = re.compile(r'^(```|~~~)', re.MULTILINE)
+TABLE_ROW_PATTERN = re.compile(r'^\s*\|.*\|\s*$', re.MULTILINE)
+MATH_PATTERN = re.compile(r'\$\$|\\\(|\\\[|(?<![\\$])\$(?!\s)[^$\n]+?(?<!\s)\$')
+IMAGE_PATTERN = re.compile(r'!\[[^\]]*\]\(')
+
+
+def get_document_features(markdown_text):
+    """Count the features of `markdown_text` that drive conversion cost."""
+    code_lines = 0
+    fences = [match.start() for match in FENCE_PATTERN.finditer(markdown_text)]
+    for open_pos, close_pos in zip(fences[::2], fences[1::2]):
+        code_lines += markdown_text.count('\n', open_pos, close_pos)
+    return {
+        'bytes': len(markdown_text.encode('utf-8')),
+        'table_rows': len(TABLE_ROW_PATTERN.findall(markdown_text)),
+        'math': len(MATH_PATTERN.findall(markdown_text)),
+        'code_lines': code_lines,
+        'images': len(IMAGE_PATTERN.findall(markdown_text)),
+    }
+
+
+def estimate_cost(markdown_text):
+    """
+    Predict the relative cost of each stage for `markdown_text`.
+
+    Returns:
+        dict: {'pandoc': float, 'tex': float}
+    """
+    features = get_document_features(markdown_text)
+    return {
+        stage: COST_BASE[stage] + sum(weights[name] * features[name] for name in weights)
+        for stage, weights in COST_WEIGHTS.items()
+    }
+
+
+class AdaptiveLimit:
+    """
+    A concurrency limit that backs off when the load average is high.
+
+    Workers call acquire() before and release() after each job. When
+    adaptive, the limit shrinks while the 1-minute load average exceeds
+    `high_load` per CPU and grows back while it is below `low_load` per CPU.
+    """
+
+    def __init__(self, maximum, adaptive=True, high_load=1.0, low_load=0.7):
+        self.maximum = maximum
+        self.limit = maximum
+        self.active = 0
+        self.adaptive = adaptive and hasattr(os, 'getloadavg')
+        self.high_load = high_load
+        self.low_load = low_load
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def adjust(self):
+        """Re-evaluate the limit from the current load average."""
+        if not self.adaptive:
+            return
+        load_per_cpu = os.getloadavg()[0] / (os.cpu_count() or 1)
+        with self.condition:
+            if load_per_cpu > self.high_load and self.limit > 1:
+                self.limit -= 1
+            elif load_per_cpu < self.low_load and self.limit < self.maximum:
+                self.limit += 1
+                self.condition.notify_all()
+
+
+def run_pipeline(jobs, has_pdflatex, config=None, pandoc_workers=2, tex_workers=None,
+                 queue_size=None, adaptive=True, adjust_interval=2.0):
+    """
+    Convert a batch of documents to LaTeX (and PDF) with a two-stage pipeline.
+
+    Args:
+        jobs: List of (markdown_text, slug) tuples
+        has_pdflatex: Whether pdflatex is available
+        config: Configuration dict (default: load_config())
+        pandoc_workers: Number of concurrent pandoc conversions
+        tex_workers: Maximum concurrent pdflatex runs (default: CPU count)
+        queue_size: Maximum .tex files waiting for the TeX stage
+            (default: twice the number of TeX workers)
+        adaptive: Scale TeX concurrency with the load average
+        adjust_interval: Seconds between load average checks
+
+    Returns:
+        list: (tex_file, pdf_file or None) for each job, in input order
+    """
+    if config is None:
+        config = load_config()
+    config = copy.deepcopy(config)
+    config['global']['auto_open_output'] = False
+
+    tex_workers = tex_workers or os.cpu_count() or 1
+    queue_size = queue_size or 2 * tex_workers
+    results = [None] * len(jobs)
+
+    # Longest predicted jobs first; the TeX queue is ordered by TeX cost
+    costs = [estimate_cost(markdown_text) for markdown_text, _ in jobs]
+    pending = sorted(range(len(jobs)),
+                     key=lambda index: costs[index]['pandoc'] + costs[index]['tex'],
+                     reverse=True)
+    pending_lock = threading.Lock()
+    tex_queue = queue.PriorityQueue(maxsize=queue_size)
+    tex_limit = AdaptiveLimit(tex_workers, adaptive)
+    pandoc_done = threading.Event()
+
+    def pandoc_worker():
+        while True:
+            with pending_lock:
+                if not pending:
+                    return
+                index = pending.pop(0)
+            markdown_text, slug = jobs[index]
+            try:
+                stage = MarkdownConverter.latex_pandoc_stage(markdown_text, config, slug)
+            except Exception as e:
+                print(f"❌ Error: {e}")
+                results[index] = (None, None)
+                continue
+            if stage['output_tex'] is None:
+                results[index] = (stage['failed_tex'], None)
+                continue
+            # Blocks while the TeX stage is behind, bounding finished-but-unbuilt work
+            tex_queue.put((-costs[index]['tex'], index, stage))
+
+    def tex_worker():
+        while True:
+            try:
+                _, index, stage = tex_queue.get(timeout=0.1)
+            except queue.Empty:
+                if pandoc_done.is_set():
+                    return
+                continue
+            tex_limit.acquire()
+            try:
+                results[index] = MarkdownConverter.latex_tex_stage(stage, has_pdflatex, config)
+            except Exception as e:
+                print(f"❌ Error: {e}")
+                results[index] = (stage['output_tex'], None)
+            finally:
+                tex_limit.release()
+                tex_queue.task_done()
+
+    pandoc_threads = [threading.Thread(target=pandoc_worker, daemon=True)
+                      for _ in range(pandoc_workers)]
+    tex_threads = [threading.Thread(target=tex_worker, daemon=True)
+                   for _ in range(tex_workers)]
+    for thread in pandoc_threads + tex_threads:
+        thread.start()
+
+    while any(thread.is_alive() for thread in pandoc_threads):
+        tex_limit.adjust()
+        for thread in pandoc_threads:
+            thread.join(adjust_interval / len(pandoc_threads))
+    pandoc_done.set()
+    while any(thread.is_alive() for thread in tex_threads):
+        tex_limit.adjust()
+        for thread in tex_threads:
+            thread.join(adjust_interval / len(tex_threads))
+
+    return results
+
+
+def main(argv=None):
+    """Convert Markdown files to LaTeX and PDF with the pipeline scheduler."""
+    parser = argparse.ArgumentParser(description="Batch-convert Markdown files to LaTeX and PDF.")
+    parser.add_argument('files', nargs='+', help="Markdown files to convert")
+    parser.add_argument('--pandoc-workers', type=int, default=2,
+                        help="Concurrent pandoc conversions")
+    parser.add_argument('--tex-workers', type=int, default=os.cpu_count() or 1,
+                        help="Maximum concurrent pdflatex runs")
+    parser.add_argument('--queue-size', type=int, help="Maximum .tex files waiting for pdflatex")
+    parser.add_argument('--no-adaptive', dest='adaptive', action='store_false',
+                        help="Do not scale pdflatex concurrency with the load average")
+    args = parser.parse_args(argv)
+
+    check_pandoc()
+    has_pdflatex = check_pdflatex()
+
+    jobs = []
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8') as f:
+            jobs.append((f.read(), os.path.splitext(os.path.basename(path))[0]))
+
+    started = time.perf_counter()
+    results = run_pipeline(jobs, has_pdflatex, load_config(), args.pandoc_workers,
+                           args.tex_workers, args.queue_size, args.adaptive)
+    elapsed = time.perf_counter() - started
+
+    built = sum(1 for tex_file, pdf_file in results if pdf_file)
+    print(f"Converted {len(results)} file(s) in {elapsed:.1f}s; {built} PDF(s) built.")
+
+
+if __name__ == '__main__':
+    main()
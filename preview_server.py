@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Preview Server - Fast HTML draft previews while writing
+
+Renders a Markdown file to self-contained HTML with embedded CSS that mimics
+the configured PDF page width, margins and font, and serves it from memory
+on a local port. The page reloads itself whenever the file changes. Math is
+left to MathJax in the browser, so no LaTeX engine runs while editing.
+
+The full PDF is only built when requested from the preview page (a POST
+to /pdf), using the normal PDF conversion. Requests whose Host header is not
+the loopback address are refused, so other sites cannot reach the server
+through DNS rebinding.
+
+    python preview_server.py notes.md --port 8000
+"""
+import os
+import sys
+import html
+import copy
+import hashlib
+import argparse
+import threading
+import subprocess
+import mimetypes
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote, urlparse
+
+import MarkdownConverter
+from markdown_utils import check_pandoc, load_config, sanitize_text
+from bibliography import add_bibliography_args
+
+
+# Page widths for the paper sizes accepted by the geometry setting
+PAPER_WIDTHS = {
+    'letter': '8.5in',
+    'legal': '8.5in',
+    'a4': '210mm',
+    'a4paper': '210mm',
+    'a5': '148mm',
+    'a5paper': '148mm',
+}
+
+# Host names the server answers to; anything else is refused
+LOCAL_HOSTS = {'127.0.0.1', 'localhost'}
+
+MATHJAX_URL = 'https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-chtml.js'
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ background: #e8e8e8; margin: 0; padding: 24px 0; }}
+main {{
+  box-sizing: border-box; width: {width}; max-width: 100%; margin: 0 auto;
+  padding: {margin}; background: #fff; box-shadow: 0 1px 4px rgba(0,0,0,.3);
+  font-family: "{font_family}", "Latin Modern Roman", Georgia, serif;
+  font-size: {font_size}; line-height: 1.35;
+}}
+img {{ max-width: 100%; }}
+pre, code {{ font-family: "Latin Modern Mono", Menlo, Consolas, monospace; font-size: 0.9em; }}
+pre {{ overflow-x: auto; background: #f6f6f6; padding: 0.5em; }}
+table {{ border-collapse: collapse; margin: 1em auto; }}
+th, td {{ border-top: 1px solid #000; border-bottom: 1px solid #000; padding: 0.2em 0.6em; }}
+#toolbar {{ position: fixed; top: 4px; right: 8px; font: 12px sans-serif; }}
+#toolbar form {{ margin: 0; }}
+</style>
+<script defer src="{mathjax_url}"></script>
+</head>
+<body>
+<div id="toolbar"><form method="post" action="/pdf"><button type="submit">Build PDF</button></form></div>
+<main>
+{body}
+</main>
+<script>
+(function () {{
+  var version = "{version}";
+  setInterval(function () {{
+    fetch("/version").then(function (r) {{ return r.text(); }}).then(function (v) {{
+      if (v !== version) {{ location.reload(); }}
+    }}).catch(function () {{}});
+  }}, 500);
+}})();
+</script>
+</body>
+</html>
+"""
+
+# Rendered pages keyed by a hash of the input and settings
+_render_cache = OrderedDict()
+_render_cache_lock = threading.Lock()
+RENDER_CACHE_SIZE = 32
+
+
+def get_page_style(format_config):
+    """Return the CSS page settings that mimic `format_config`'s geometry and font."""
+    geometry = format_config.get('geometry', {})
+    font = format_config.get('font', {})
+    paper = geometry.get('paper', 'letter')
+    return {
+        'width': PAPER_WIDTHS.get(paper, PAPER_WIDTHS['letter']),
+        'margin': geometry.get('margin', '1in'),
+        'font_family': font.get('family', 'Latin Modern Roman'),
+        'font_size': font.get('size', '10pt'),
+    }
+
+
+def render_html_body(markdown_text, config):
+    """
+    Convert `markdown_text` to an HTML fragment with pandoc.
+
+    Returns:
+        str: HTML body, or an error message formatted as HTML
+    """
+    args = ['pandoc', '-f', 'markdown', '-t', 'html5', '--mathjax']
+    args = add_bibliography_args(args, markdown_text, config)
+
+    env = os.environ.copy()
+    env['TMPDIR'] = os.getcwd()
+    result = subprocess.run(args, input=markdown_text.encode('utf-8'), env=env, capture_output=True)
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', errors='ignore')
+        return f"<h1>pandoc failed</h1><pre>{html.escape(error)}</pre>"
+    return result.stdout.decode('utf-8')
+
+
+def render_preview(markdown_text, config, title='Preview'):
+    """
+    Render `markdown_text` as a self-contained HTML page.
+
+    Pages are cached in memory by content and settings, so unchanged input
+    is never converted twice.
+
+    Returns:
+        tuple: (html: str, version: str)
+    """
+    markdown_text = sanitize_text(markdown_text)
+    style = get_page_style(config['pdf'])
+    key = hashlib.sha256(
+        repr((markdown_text, sorted(style.items()), config.get('bibliography'))).encode('utf-8')
+    ).hexdigest()
+
+    with _render_cache_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            return _render_cache[key], key[:16]
+
+    page = PAGE_TEMPLATE.format(
+        title=html.escape(title),
+        body=render_html_body(markdown_text, config),
+        version=key[:16],
+        mathjax_url=MATHJAX_URL,
+        **{name: html.escape(value) for name, value in style.items()},
+    )
+
+    with _render_cache_lock:
+        _render_cache[key] = page
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return page, key[:16]
+
+
+class PreviewState:
+    """The watched file and its most recently rendered preview."""
+
+    def __init__(self, path, config):
+        self.path = os.path.abspath(path)
+        self.config = config
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.page = ''
+        self.version = ''
+        self.refresh()
+
+    def refresh(self):
+        """Re-render the preview if the file changed since the last render."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self.mtime:
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            markdown_text = f.read()
+        page, version = render_preview(markdown_text, self.config, os.path.basename(self.path))
+        with self.lock:
+            self.mtime = mtime
+            self.page = page
+            self.version = version
+
+    def build_pdf(self):
+        """
+        Build the full PDF through the normal conversion path.
+
+        Images are resolved and the PDF is written relative to the
+        document's directory, as the preview page serves them.
+        """
+        with open(self.path, 'r', encoding='utf-8') as f:
+            markdown_text = f.read()
+        config = copy.deepcopy(self.config)
+        config['global']['auto_open_output'] = False
+        slug = os.path.splitext(os.path.basename(self.path))[0]
+        return MarkdownConverter.convert_to_pdf(markdown_text, config, slug,
+                                                work_dir=os.path.dirname(self.path))
+
+
+def is_local_host(host):
+    """Return True if a Host or Origin value names the loopback interface."""
+    if not host:
+        return False
+    host = urlparse(host).netloc if '://' in host else host
+    return host.rsplit(':', 1)[0].lower() in LOCAL_HOSTS
+
+
+def make_handler(state):
+    """Return a request handler class serving `state`."""
+    base_dir = os.path.dirname(state.path)
+
+    class PreviewHandler(BaseHTTPRequestHandler):
+        def send_body(self, status, content_type, body):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def check_host(self):
+            """Refuse requests that did not come through a loopback host name."""
+            if is_local_host(self.headers.get('Host')):
+                return True
+            self.send_body(403, 'text/plain', b'Forbidden')
+            return False
+
+        def do_GET(self):
+            if not self.check_host():
+                return
+            path = unquote(urlparse(self.path).path)
+            if path == '/':
+                with state.lock:
+                    page = state.page
+                self.send_body(200, 'text/html; charset=utf-8', page.encode('utf-8'))
+            elif path == '/version':
+                with state.lock:
+                    version = state.version
+                self.send_body(200, 'text/plain', version.encode('utf-8'))
+            elif path == '/pdf':
+                # Building runs the converter, so it is never triggered by a GET
+                self.send_response(405)
+                self.send_header('Allow', 'POST')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            else:
+                # Images and other files referenced relative to the document
+                file_path = os.path.normpath(os.path.join(base_dir, path.lstrip('/')))
+                if not file_path.startswith(base_dir + os.sep) or not os.path.isfile(file_path):
+                    self.send_body(404, 'text/plain', b'Not found')
+                    return
+                content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+                with open(file_path, 'rb') as f:
+                    self.send_body(200, content_type, f.read())
+
+        def do_POST(self):
+            if not self.check_host():
+                return
+            if urlparse(self.path).path != '/pdf':
+                self.send_body(404, 'text/plain', b'Not found')
+                return
+            origin = self.headers.get('Origin')
+            if origin is not None and not is_local_host(origin):
+                self.send_body(403, 'text/plain', b'Forbidden')
+                return
+            pdf_file = state.build_pdf()
+            if not os.path.exists(pdf_file):
+                self.send_body(500, 'text/plain', b'PDF build failed; see the server log.')
+                return
+            with open(pdf_file, 'rb') as f:
+                self.send_body(200, 'application/pdf', f.read())
+
+        def log_message(self, format, *args):
+            pass  # Keep the terminal quiet; reloads poll twice a second
+
+    return PreviewHandler
+
+
+def watch_file(state, stop_event, interval=0.2):
+    """Re-render `state` whenever its file changes, until `stop_event` is set."""
+    while not stop_event.wait(interval):
+        try:
+            state.refresh()
+        except Exception as e:
+            print(f"Warning: Failed to render preview: {e}")
+
+
+def serve_preview(path, port=8000, config=None, open_browser=True):
+    """
+    Serve a live preview of the Markdown file at `path` until interrupted.
+    """
+    if config is None:
+        config = load_config()
+    state = PreviewState(path, config)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    stop_event = threading.Event()
+    threading.Thread(target=watch_file, args=(state, stop_event), daemon=True).start()
+
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    print(f"👀 Previewing {path} at {url} (Ctrl-C to stop)")
+    if open_browser:
+        import webbrowser
+        webbrowser.open(url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Preview stopped.")
+    finally:
+        stop_event.set()
+        server.server_close()
+
+
+def main(argv=None):
+    """Parse command-line arguments and start the preview server."""
+    parser = argparse.ArgumentParser(description="Live HTML preview of a Markdown file.")
+    parser.add_argument('file', help="Markdown file to preview")
+    parser.add_argument('-p', '--port', type=int, default=8000)
+    parser.add_argument('--no-browser', dest='open_browser', action='store_false',
+                        help="Do not open the preview in a browser")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.file):
+        sys.exit(f"Error: {args.file} not found.")
+    check_pandoc()
+    serve_preview(args.file, args.port, open_browser=args.open_browser)
+
+
+if __name__ == '__main__':
+    main()
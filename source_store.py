@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Source Store - Content-addressed storage for saved Markdown sources
+
+When `save_markdown_source` is enabled, every output gets a copy of its
+Markdown source. With the source store enabled, each distinct source is
+stored once under its SHA-256 hash and the file next to each output is a
+hardlink (or, across filesystems, a reflink or copy) to the stored blob.
+
+Blobs can optionally be compressed with gzip or zstd (zstd requires the
+`zstandard` package). Compressed blobs are linked next to outputs as
+`.md.gz` or `.md.zst` files.
+
+Run `python source_store.py gc` to delete blobs that no output references
+anymore, or `python source_store.py stats` to see how much space is saved.
+"""
+import os
+import sys
+import gzip
+import shutil
+import hashlib
+import argparse
+import threading
+import subprocess
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+
+COMPRESSION_EXTENSIONS = {
+    'none': '.md',
+    'gzip': '.md.gz',
+    'zstd': '.md.zst',
+}
+
+
+def get_store_dir(store_config):
+    """Return the expanded source store directory."""
+    return os.path.expanduser(store_config.get('dir', '~/.markdown-converter/sources'))
+
+
+def get_compression(store_config):
+    """Return the configured compression, falling back to gzip if zstd is unavailable."""
+    compression = store_config.get('compression', 'none')
+    if compression not in COMPRESSION_EXTENSIONS:
+        print(f"Warning: Unknown source store compression '{compression}'; storing uncompressed.")
+        return 'none'
+    if compression == 'zstd' and zstandard is None:
+        print("Warning: zstandard is not installed; compressing saved sources with gzip.")
+        return 'gzip'
+    return compression
+
+
+def compress_data(data, compression):
+    """Compress `data` bytes with the given compression."""
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    return data
+
+
+def decompress_data(data, compression):
+    """Reverse compress_data."""
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    if compression == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def get_blob_path(store_dir, digest, compression):
+    """Return the path of the blob for `digest`."""
+    return os.path.join(store_dir, 'objects', digest[:2], digest + COMPRESSION_EXTENSIONS[compression])
+
+
+def get_refs_path(store_dir, digest):
+    """Return the path of the file listing outputs that reference `digest`."""
+    return os.path.join(store_dir, 'refs', digest[:2], digest + '.txt')
+
+
+def write_blob(store_dir, markdown_text, compression):
+    """
+    Store `markdown_text` in the content-addressed store if it is not there yet.
+
+    Returns:
+        tuple: (digest: str, blob_path: str)
+    """
+    data = markdown_text.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    blob_path = get_blob_path(store_dir, digest, compression)
+
+    if not os.path.exists(blob_path):
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        temp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(compress_data(data, compression))
+        # Blobs are shared by hardlinks, so keep them from being edited in place
+        os.chmod(temp_path, 0o444)
+        os.replace(temp_path, blob_path)
+
+    return digest, blob_path
+
+
+def reflink_or_copy(source, target):
+    """Clone `source` to `target` with a reflink where supported, else copy it."""
+    if sys.platform.startswith('darwin'):
+        command = ['cp', '-c', source, target]
+    elif sys.platform.startswith('linux'):
+        command = ['cp', '--reflink=always', source, target]
+    else:
+        command = None
+
+    if command:
+        try:
+            if subprocess.run(command, capture_output=True).returncode == 0:
+                return
+        except OSError:
+            pass
+    shutil.copyfile(source, target)
+
+
+def link_blob(blob_path, target_path):
+    """Hardlink `target_path` to `blob_path`, falling back to a reflink or copy."""
+    if os.path.lexists(target_path):
+        os.remove(target_path)
+    try:
+        os.link(blob_path, target_path)
+    except OSError:
+        reflink_or_copy(blob_path, target_path)
+
+
+def add_reference(store_dir, digest, target_path):
+    """Record that `target_path` references the blob for `digest`."""
+    refs_path = get_refs_path(store_dir, digest)
+    os.makedirs(os.path.dirname(refs_path), exist_ok=True)
+    with open(refs_path, 'a', encoding='utf-8') as f:
+        f.write(os.path.abspath(target_path) + '\n')
+
+
+def store_markdown_source(markdown_text, output_file_path, store_config):
+    """
+    Save `markdown_text` next to `output_file_path` via the source store.
+
+    Args:
+        markdown_text: String containing the markdown content
+        output_file_path: Path to the converted output file
+        store_config: The `source_store` configuration dict
+
+    Returns:
+        str: Path of the saved markdown file next to the output
+    """
+    store_dir = get_store_dir(store_config)
+    compression = get_compression(store_config)
+    digest, blob_path = write_blob(store_dir, markdown_text, compression)
+
+    target_path = os.path.splitext(output_file_path)[0] + COMPRESSION_EXTENSIONS[compression]
+    link_blob(blob_path, target_path)
+    add_reference(store_dir, digest, target_path)
+    return target_path
+
+
+def iter_blobs(store_dir):
+    """Yield (digest, compression, blob_path) for every blob in the store."""
+    objects_dir = os.path.join(store_dir, 'objects')
+    if not os.path.isdir(objects_dir):
+        return
+    for prefix in sorted(os.listdir(objects_dir)):
+        prefix_dir = os.path.join(objects_dir, prefix)
+        for name in sorted(os.listdir(prefix_dir)):
+            for compression, ext in COMPRESSION_EXTENSIONS.items():
+                digest = name[:-len(ext)]
+                if name.endswith(ext) and len(digest) == 64:
+                    yield digest, compression, os.path.join(prefix_dir, name)
+                    break
+
+
+def read_references(store_dir, digest):
+    """Return the recorded output paths for `digest` that still exist."""
+    refs_path = get_refs_path(store_dir, digest)
+    if not os.path.exists(refs_path):
+        return []
+    with open(refs_path, 'r', encoding='utf-8') as f:
+        paths = dict.fromkeys(line.strip() for line in f if line.strip())
+    return [path for path in paths if os.path.exists(path)]
+
+
+def is_referenced(store_dir, digest, blob_path):
+    """Return True if any output still uses the blob for `digest`."""
+    blob_stat = os.stat(blob_path)
+    if blob_stat.st_nlink > 1:
+        return True
+
+    # Reflinked or copied files do not show up in the link count
+    for path in read_references(store_dir, digest):
+        path_stat = os.stat(path)
+        if path_stat.st_ino == blob_stat.st_ino and path_stat.st_dev == blob_stat.st_dev:
+            continue
+        with open(path, 'rb') as f, open(blob_path, 'rb') as blob:
+            if f.read() == blob.read():
+                return True
+    return False
+
+
+def collect_garbage(store_dir, dry_run=False):
+    """
+    Delete blobs that no output references anymore.
+
+    Returns:
+        tuple: (blobs_removed: int, bytes_freed: int)
+    """
+    removed = 0
+    freed = 0
+    for digest, _, blob_path in iter_blobs(store_dir):
+        if is_referenced(store_dir, digest, blob_path):
+            # Drop references to outputs that were deleted
+            refs_path = get_refs_path(store_dir, digest)
+            if not dry_run and os.path.exists(refs_path):
+                live = read_references(store_dir, digest)
+                with open(refs_path, 'w', encoding='utf-8') as f:
+                    f.writelines(path + '\n' for path in live)
+            continue
+
+        removed += 1
+        freed += os.path.getsize(blob_path)
+        if not dry_run:
+            os.remove(blob_path)
+            refs_path = get_refs_path(store_dir, digest)
+            if os.path.exists(refs_path):
+                os.remove(refs_path)
+    return removed, freed
+
+
+def get_store_stats(store_dir):
+    """
+    Summarize the store.
+
+    Returns:
+        dict: Blob count, stored bytes, and bytes the linked outputs would use as copies
+    """
+    stats = {'blobs': 0, 'stored_bytes': 0, 'references': 0, 'logical_bytes': 0}
+    for digest, _, blob_path in iter_blobs(store_dir):
+        size = os.path.getsize(blob_path)
+        refs = max(1, len(read_references(store_dir, digest)))
+        stats['blobs'] += 1
+        stats['stored_bytes'] += size
+        stats['references'] += refs
+        stats['logical_bytes'] += size * refs
+    return stats
+
+
+def main(argv=None):
+    """Command-line interface for source store maintenance."""
+    # Imported here so the store itself has no dependency on markdown_utils
+    from markdown_utils import load_config
+
+    parser = argparse.ArgumentParser(description="Maintain the saved Markdown source store.")
+    parser.add_argument('--dir', help="Store directory (default: from markdown-converter.json)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    gc_parser = subparsers.add_parser('gc', help="Delete blobs no output references")
+    gc_parser.add_argument('-n', '--dry-run', action='store_true',
+                           help="Report what would be deleted without deleting")
+    subparsers.add_parser('stats', help="Show store usage")
+    args = parser.parse_args(argv)
+
+    store_dir = args.dir or get_store_dir(load_config()['global'].get('source_store', {}))
+
+    if args.command == 'gc':
+        removed, freed = collect_garbage(store_dir, args.dry_run)
+        action = "Would remove" if args.dry_run else "Removed"
+        print(f"{action} {removed} unreferenced blob(s), {freed} bytes.")
+    else:
+        stats = get_store_stats(store_dir)
+        print(f"Blobs: {stats['blobs']}")
+        print(f"References: {stats['references']}")
+        print(f"Stored: {stats['stored_bytes']} bytes")
+        print(f"Saved: {stats['logical_bytes'] - stats['stored_bytes']} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Spool Daemon - Durable queued conversions from a spool directory
+
+Upstream systems drop Markdown files into `<spool>/inbox` and the daemon
+converts them with a pool of workers. Each job is a `.md` file with an
+optional JSON sidecar of the same name:
+
+    inbox/report.md
+    inbox/report.json   {"format": "pdf", "slug": "Weekly Report",
+                         "config": {"pdf": {"font": {"size": "12pt"}}}}
+
+Producers should write the sidecar first and the `.md` file last, using a
+temporary name followed by a rename, so the daemon never sees a partial job.
+
+Jobs are claimed by renaming them into a private directory under
+`<spool>/work/<host>-<pid>/`, which is atomic, so several daemons can share
+one inbox. Finished jobs move to `done/` or `failed/` together with a
+`.result.json` describing the outcome; a job whose name is already taken
+there is stored as `<name>-1`, `<name>-2` and so on.
+Failed jobs are retried with exponential backoff before being given up on,
+and jobs left in `work/` by a daemon that died are returned to the inbox on
+the next start.
+"""
+import os
+import copy
+import json
+import time
+import socket
+import signal
+import argparse
+import tempfile
+import threading
+
+import MarkdownConverter
+from markdown_utils import check_pandoc, check_pdflatex, load_config, deep_merge
+
+SPOOL_SUBDIRS = ('inbox', 'work', 'done', 'failed')
+VALID_FORMATS = ('pdf', 'docx', 'latex')
+
+
+def ensure_spool_dirs(spool_dir):
+    """Create the inbox, work, done and failed directories."""
+    for name in SPOOL_SUBDIRS:
+        os.makedirs(os.path.join(spool_dir, name), exist_ok=True)
+
+
+def get_worker_dir(spool_dir):
+    """Return this daemon's private claim directory under `work/`."""
+    return os.path.join(spool_dir, 'work', f"{socket.gethostname()}-{os.getpid()}")
+
+
+def get_sidecar_path(md_path):
+    """Return the JSON sidecar path for a job's `.md` file."""
+    return os.path.splitext(md_path)[0] + '.json'
+
+
+def read_sidecar(md_path):
+    """Read a job's sidecar, returning an empty dict if it has none."""
+    sidecar = get_sidecar_path(md_path)
+    if not os.path.exists(sidecar):
+        return {}
+    with open(sidecar, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_json_atomic(path, data):
+    """Write `data` as JSON to `path` via a temporary file and rename."""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def move_file_exclusive(source, target):
+    """
+    Move `source` to `target` without ever replacing an existing `target`.
+
+    Raises:
+        FileExistsError: If `target` already exists
+    """
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        raise
+    except OSError:
+        # No hard links on this filesystem; fall back to a checked rename
+        if os.path.exists(target):
+            raise FileExistsError(target)
+        os.rename(source, target)
+        return
+    os.remove(source)
+
+
+def move_job(md_path, target_dir):
+    """
+    Move a job's `.md` file, sidecar and result into `target_dir`.
+
+    The sidecar and result are moved first so the `.md` file, which marks
+    the job as ready, only appears once they are in place. Existing jobs
+    in `target_dir` are never replaced; if the name is taken the job is
+    renamed `<name>-1`, `<name>-2` and so on.
+
+    Returns:
+        str: New path of the `.md` file
+    """
+    base_path = os.path.splitext(md_path)[0]
+    base_name = os.path.basename(base_path)
+    sources = [path for path in (f"{base_path}.json", f"{base_path}.result.json")
+               if os.path.exists(path)] + [md_path]
+
+    index = 0
+    while True:
+        name = base_name if index == 0 else f"{base_name}-{index}"
+        index += 1
+        moved = []
+        try:
+            for source in sources:
+                suffix = source[len(base_path):]
+                target = os.path.join(target_dir, name + suffix)
+                move_file_exclusive(source, target)
+                moved.append((source, target))
+        except FileExistsError:
+            for source, target in reversed(moved):
+                os.rename(target, source)
+            continue
+        return os.path.join(target_dir, f"{name}.md")
+
+
+def is_process_alive(pid):
+    """Return True if a process with `pid` exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recover_orphaned_jobs(spool_dir):
+    """
+    Return jobs claimed by dead daemons on this host to the inbox.
+
+    Returns:
+        int: Number of jobs recovered
+    """
+    host = socket.gethostname()
+    work_root = os.path.join(spool_dir, 'work')
+    inbox = os.path.join(spool_dir, 'inbox')
+    recovered = 0
+
+    for entry in os.listdir(work_root):
+        owner_host, _, pid = entry.rpartition('-')
+        if owner_host != host or not pid.isdigit():
+            continue
+        if int(pid) != os.getpid() and is_process_alive(int(pid)):
+            continue
+
+        claim_dir = os.path.join(work_root, entry)
+        for root, dirs, files in os.walk(claim_dir, topdown=False):
+            for name in sorted(files):
+                if name.endswith('.md'):
+                    move_job(os.path.join(root, name), inbox)
+                    recovered += 1
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+    return recovered
+
+
+def claim_next_job(spool_dir, worker_dir):
+    """
+    Atomically claim the oldest ready job in the inbox.
+
+    Returns:
+        str or None: Path of the claimed `.md` file in a new directory inside `worker_dir`
+    """
+    inbox = os.path.join(spool_dir, 'inbox')
+    now = time.time()
+    candidates = []
+
+    for name in os.listdir(inbox):
+        if not name.endswith('.md'):
+            continue
+        path = os.path.join(inbox, name)
+        try:
+            candidates.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            continue  # Claimed by another worker
+
+    for _, path in sorted(candidates):
+        try:
+            if read_sidecar(path).get('not_before', 0) > now:
+                continue  # Waiting out a retry backoff
+        except (OSError, ValueError):
+            pass  # Let the worker report the broken sidecar
+        # A private directory per job, so jobs with the same name never collide
+        job_dir = tempfile.mkdtemp(prefix='job-', dir=worker_dir)
+        claimed = os.path.join(job_dir, os.path.basename(path))
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            os.rmdir(job_dir)
+            continue  # Another worker won the race
+        sidecar = get_sidecar_path(path)
+        if os.path.exists(sidecar):
+            os.replace(sidecar, get_sidecar_path(claimed))
+        return claimed
+
+    return None
+
+
+def run_job(md_path, base_config, has_pdflatex):
+    """
+    Convert a claimed job.
+
+    Returns:
+        dict: Result with 'success', 'outputs' and, on failure, 'error'
+    """
+    job = read_sidecar(md_path)
+    output_format = job.get('format', 'pdf')
+    if output_format not in VALID_FORMATS:
+        return {'success': False, 'outputs': [],
+                'error': f"Unknown format '{output_format}'", 'retry': False}
+
+    config = deep_merge(copy.deepcopy(base_config), job.get('config', {}))
+    config['global']['auto_open_output'] = False
+
+    with open(md_path, 'r', encoding='utf-8') as f:
+        markdown_text = f.read()
+    slug = job.get('slug')
+
+    if output_format == 'pdf':
+        outputs = [MarkdownConverter.convert_to_pdf(markdown_text, config, slug)]
+    elif output_format == 'docx':
+        outputs = [MarkdownConverter.convert_to_word(markdown_text, config, slug)]
+    else:
+        tex_file, pdf_file = MarkdownConverter.convert_to_latex(
+            markdown_text, has_pdflatex, config, slug
+        )
+        outputs = [tex_file] + ([pdf_file] if pdf_file else [])
+        if config['latex'].get('compile_pdf', True) and has_pdflatex and not pdf_file:
+            return {'success': False, 'outputs': outputs, 'error': 'pdflatex failed'}
+
+    missing = [path for path in outputs if not os.path.exists(path)]
+    if missing:
+        return {'success': False, 'outputs': outputs,
+                'error': f"Output not created: {', '.join(missing)}"}
+    return {'success': True, 'outputs': [os.path.abspath(path) for path in outputs]}
+
+
+def finish_job(md_path, spool_dir, result, max_retries, backoff):
+    """Move a processed job to done/, failed/, or back to the inbox for a retry."""
+    base_name = os.path.splitext(os.path.basename(md_path))[0]
+
+    if not result['success']:
+        try:
+            job = read_sidecar(md_path)
+        except (OSError, ValueError):
+            job, result['retry'] = {}, False
+        attempts = job.get('attempts', 0) + 1
+        if result.get('retry', True) and attempts <= max_retries:
+            job['attempts'] = attempts
+            job['not_before'] = time.time() + backoff * (2 ** (attempts - 1))
+            write_json_atomic(get_sidecar_path(md_path), job)
+            move_job(md_path, os.path.join(spool_dir, 'inbox'))
+            print(f"Warning: job {base_name} failed ({result['error']}); "
+                  f"retry {attempts}/{max_retries} scheduled.")
+            return
+        result['attempts'] = attempts
+
+    target_dir = os.path.join(spool_dir, 'done' if result['success'] else 'failed')
+    result.pop('retry', None)
+    result['finished'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    write_json_atomic(os.path.splitext(md_path)[0] + '.result.json', result)
+    move_job(md_path, target_dir)
+    status = 'done' if result['success'] else f"failed: {result['error']}"
+    print(f"Job {base_name} {status}")
+
+
+def worker_loop(spool_dir, worker_dir, config, has_pdflatex, stop_event,
+                poll_interval, max_retries, backoff):
+    """Claim and process jobs until `stop_event` is set."""
+    while not stop_event.is_set():
+        md_path = claim_next_job(spool_dir, worker_dir)
+        if md_path is None:
+            stop_event.wait(poll_interval)
+            continue
+        try:
+            result = run_job(md_path, config, has_pdflatex)
+        except Exception as e:
+            result = {'success': False, 'outputs': [], 'error': str(e)}
+        try:
+            finish_job(md_path, spool_dir, result, max_retries, backoff)
+            os.rmdir(os.path.dirname(md_path))
+        except Exception as e:
+            print(f"Warning: Failed to finish job {md_path}: {e}")
+
+
+def run_daemon(spool_dir, workers=4, poll_interval=1.0, max_retries=3, backoff=5.0,
+               stop_event=None):
+    """
+    Process jobs from `spool_dir` until interrupted.
+
+    Args:
+        spool_dir: Spool root containing inbox/, work/, done/ and failed/
+        workers: Number of concurrent conversions
+        poll_interval: Seconds to wait when the inbox is empty
+        max_retries: Retries for a failed job before it is moved to failed/
+        backoff: Delay before the first retry, doubled for each further retry
+        stop_event: Optional threading.Event that stops the daemon when set
+    """
+    spool_dir = os.path.abspath(spool_dir)
+    ensure_spool_dirs(spool_dir)
+
+    check_pandoc()
+    has_pdflatex = check_pdflatex()
+    config = load_config()
+
+    recovered = recover_orphaned_jobs(spool_dir)
+    if recovered:
+        print(f"Recovered {recovered} orphaned job(s).")
+
+    worker_dir = get_worker_dir(spool_dir)
+    os.makedirs(worker_dir, exist_ok=True)
+
+    if stop_event is None:
+        stop_event = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda signum, frame: stop_event.set())
+
+    print(f"Watching {os.path.join(spool_dir, 'inbox')} with {workers} worker(s)...")
+    threads = [
+        threading.Thread(
+            target=worker_loop,
+            args=(spool_dir, worker_dir, config, has_pdflatex, stop_event,
+                  poll_interval, max_retries, backoff),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        while thread.is_alive():
+            thread.join(0.5)
+
+    # Anything still claimed (e.g. after a crash in finish_job) goes back
+    recover_orphaned_jobs(spool_dir)
+    print("Spool daemon stopped.")
+
+
+def main(argv=None):
+    """Parse command-line arguments and run the daemon."""
+    parser = argparse.ArgumentParser(description="Convert Markdown jobs from a spool directory.")
+    parser.add_argument('spool_dir', help="Spool root containing inbox/, work/, done/ and failed/")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of concurrent conversions")
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help="Seconds to wait when the inbox is empty")
+    parser.add_argument('--max-retries', type=int, default=3,
+                        help="Retries before a job is moved to failed/")
+    parser.add_argument('--backoff', type=float, default=5.0,
+                        help="Seconds before the first retry, doubled each time")
+    args = parser.parse_args(argv)
+
+    run_daemon(args.spool_dir, args.workers, args.poll_interval, args.max_retries, args.backoff)
+
+
+if __name__ == '__main__':
+    main()
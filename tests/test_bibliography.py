@@ -0,0 +1,57 @@
+import os
+import json
+import subprocess
+from unittest.mock import patch
+
+import bibliography
+from bibliography import find_citation_keys, add_bibliography_args
+
+
+def test_find_citation_keys():
+    text = (
+        "As shown [@smith2020, p. 4; -@doe:2019] and @{Key With Space}.\n"
+        "See @knuth84. Contact me at someone@example.com.\n"
+    )
+    assert find_citation_keys(text) == {'smith2020', 'doe:2019', 'Key With Space', 'knuth84'}
+    assert '*' in find_citation_keys("---\nnocite: '@*'\n---\n")
+
+
+def make_fake_pandoc(entries, calls):
+    def fake_run(command, **kwargs):
+        calls.append(command)
+        with open(command[command.index('-o') + 1], 'w') as f:
+            json.dump(entries, f)
+        return subprocess.CompletedProcess(command, 0, stdout=b'', stderr=b'')
+    return fake_run
+
+
+def test_bibliography_is_converted_once_and_pruned(tmp_path):
+    bibliography._entries_cache.clear()
+    bib = tmp_path / 'library.bib'
+    bib.write_text('@article{a, title={A}}\n@article{b, title={B}}\n')
+    config = {'bibliography': {'files': [str(bib)], 'cache_dir': str(tmp_path / 'cache')}}
+    entries = [{'id': 'a', 'title': 'A'}, {'id': 'b', 'title': 'B'}, {'id': 'c', 'title': 'C'}]
+    calls = []
+
+    with patch('subprocess.run', side_effect=make_fake_pandoc(entries, calls)):
+        args = add_bibliography_args(['pandoc'], 'Cites [@a; @c].', config)
+        add_bibliography_args(['pandoc'], 'Cites @b.', config)
+        # Touching the file changes its mtime but not its content
+        os.utime(bib, (0, 0))
+        bibliography._entries_cache.clear()
+        add_bibliography_args(['pandoc'], 'Cites @b.', config)
+
+    assert len(calls) == 1
+    assert args[:2] == ['pandoc', '--citeproc']
+    with open(args[args.index('--bibliography') + 1]) as f:
+        assert [entry['id'] for entry in json.load(f)] == ['a', 'c']
+
+    # @mentions that are not bibliography entries do not enable citeproc
+    with patch('subprocess.run', side_effect=make_fake_pandoc(entries, calls)):
+        assert add_bibliography_args(['pandoc'], 'Thanks @nobody.', config) == ['pandoc']
+
+
+def test_no_citations_leaves_args_unchanged(tmp_path):
+    config = {'bibliography': {'files': [str(tmp_path / 'library.bib')]}}
+    assert add_bibliography_args(['pandoc'], 'No citations here.', config) == ['pandoc']
+    assert add_bibliography_args(['pandoc'], 'Cites @a.', {}) == ['pandoc']
@@ -0,0 +1,136 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from image_assets import (
+    find_image_references, is_local_image, get_target_extension, prepare_images,
+    process_raster_image
+)
+
+
+def test_find_image_references():
+    text = (
+        '![Plot](figs/plot.png)\n'
+        '![Diagram](<my figs/diagram.svg> "Title")\n'
+        '![Remote](https://example.com/a.png)\n'
+    )
+    assert find_image_references(text) == [
+        'figs/plot.png', 'my figs/diagram.svg', 'https://example.com/a.png'
+    ]
+    assert is_local_image('figs/plot.png')
+    assert not is_local_image('https://example.com/a.png')
+    assert not is_local_image('notes.txt')
+
+
+def test_svg_target_depends_on_format():
+    assert get_target_extension('a.svg', 'docx') == '.png'
+    assert get_target_extension('a.svg', 'latex') == '.pdf'
+    assert get_target_extension('a.jpeg', 'pdf') == '.jpg'
+
+
+def test_prepare_images_rewrites_and_caches(tmp_path):
+    image = tmp_path / 'plot.png'
+    image.write_bytes(b'fake png data')
+    config = {'images': {'cache_dir': str(tmp_path / 'cache'), 'workers': 2}}
+
+    def fake_process(source_path, target_path, settings):
+        with open(target_path, 'wb') as f:
+            f.write(b'small')
+        return True
+
+    with patch('image_assets.process_raster_image', side_effect=fake_process) as mock:
+        text = '![Plot](plot.png "A plot") and ![Missing](missing.png)'
+        result = prepare_images(text, 'pdf', config, base_dir=str(tmp_path))
+        prepare_images(text, 'pdf', config, base_dir=str(tmp_path))
+
+    # Second run is served from the cache
+    assert mock.call_count == 1
+    assert '![Missing](missing.png)' in result
+    cached = result.split('](<', 1)[1].split('>', 1)[0]
+    assert cached.startswith(str(tmp_path / 'cache'))
+    assert result == f'![Plot](<{cached}> "A plot") and ![Missing](missing.png)'
+    assert open(cached, 'rb').read() == b'small'
+
+
+def test_prepare_images_disabled(tmp_path):
+    config = {'images': {'enabled': False}}
+    text = '![Plot](plot.png)'
+    assert prepare_images(text, 'pdf', config, base_dir=str(tmp_path)) == text
+
+
+def test_prepare_images_keeps_latex_references(tmp_path):
+    (tmp_path / 'plot.png').write_bytes(b'fake png data')
+    config = {'images': {'cache_dir': str(tmp_path / 'cache')}}
+    text = '![Plot](plot.png)'
+
+    with patch('image_assets.process_raster_image') as mock:
+        assert prepare_images(text, 'latex', config, base_dir=str(tmp_path)) == text
+    mock.assert_not_called()
+
+
+def test_prepare_images_copies_latex_images_under_relative_names(tmp_path):
+    (tmp_path / 'figs').mkdir()
+    (tmp_path / 'figs' / 'plot.png').write_bytes(b'fake png data')
+    (tmp_path / 'figs' / 'diagram.svg').write_bytes(b'<svg/>')
+    config = {'images': {'cache_dir': str(tmp_path / 'cache')}}
+    image_dir = tmp_path / 'LaTeX' / 'doc-images'
+
+    def fake_process(source_path, target_path, settings):
+        with open(target_path, 'wb') as f:
+            f.write(b'small')
+        return True
+
+    with patch('image_assets.process_raster_image', side_effect=fake_process), \
+            patch('image_assets.process_svg_image', side_effect=fake_process):
+        result = prepare_images('![P](figs/plot.png) ![D](./figs/diagram.svg "D")', 'latex',
+                                config, base_dir=str(tmp_path), image_dir=str(image_dir))
+
+    assert result == '![P](figs/plot.png) ![D](<figs/diagram.pdf> "D")'
+    assert (image_dir / 'figs' / 'plot.png').read_bytes() == b'small'
+    assert (image_dir / 'figs' / 'diagram.pdf').read_bytes() == b'small'
+
+
+def test_concurrent_processing_of_the_same_image(tmp_path):
+    (tmp_path / 'plot.png').write_bytes(b'fake png data')
+    config = {'images': {'cache_dir': str(tmp_path / 'cache'), 'workers': 1}}
+    barrier = threading.Barrier(4)
+    results = []
+
+    def slow_process(source_path, target_path, settings):
+        with open(target_path, 'wb') as f:
+            f.write(b'sm')
+            time.sleep(0.05)
+            f.write(b'all')
+        return True
+
+    def convert():
+        barrier.wait()
+        results.append(prepare_images('![x](plot.png)', 'pdf', config, base_dir=str(tmp_path)))
+
+    with patch('image_assets.process_raster_image', side_effect=slow_process):
+        threads = [threading.Thread(target=convert) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(set(results)) == 1
+    cached = results[0].split('](<', 1)[1].split('>', 1)[0]
+    assert cached.startswith(str(tmp_path / 'cache'))
+    assert open(cached, 'rb').read() == b'small'
+
+
+def test_raster_images_keep_their_exif_orientation(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    source = str(tmp_path / 'photo.jpg')
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise to display
+    Image.new('RGB', (40, 20)).save(source, 'JPEG', exif=exif)
+
+    target = str(tmp_path / 'out.jpg')
+    assert process_raster_image(source, target, {'dpi': 10, 'max_width_in': 100,
+                                                 'jpeg_quality': 85})
+    with Image.open(target) as image:
+        assert image.size == (20, 40)
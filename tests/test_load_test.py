@@ -0,0 +1,39 @@
+from load_test import (
+    generate_corpus, percentile, run_load_test, format_summary,
+    run_normalizer_benchmark, format_benchmark_summary
+)
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_generate_corpus_is_deterministic():
+    assert generate_corpus(5, seed=1) == generate_corpus(5, seed=1)
+    assert len(generate_corpus(7)) == 7
+
+
+def test_run_load_test_with_stub_tools():
+    report = run_load_test(requests=6, concurrency=2, formats=('pdf', 'docx', 'latex'),
+                           corpus_size=3, stub_tools=True, pandoc_latency=0,
+                           pdflatex_latency=0, sample_interval=0.05)
+
+    summary = report['summary']
+    assert summary['succeeded'] == 6
+    assert summary['failed'] == 0
+    assert set(summary['latency']) == {'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}
+    assert summary['by_format']['latex']['requests'] == 2
+    assert 'throughput_rps' in format_summary(report)
+
+
+def test_normalizer_benchmark_with_stub_tools():
+    report = run_normalizer_benchmark(formats=('docx',), scale=0.01, stub_tools=True)
+
+    assert len(report['runs']) == 8
+    assert all(run['success'] for run in report['runs'])
+    assert report['totals']['docx']['failed_after'] == 0
+    assert 'docx: seconds_before=' in format_benchmark_summary(report)
@@ -0,0 +1,99 @@
+from markdown_utils import get_default_config
+from markdown_normalizer import normalize_markdown, split_cells
+
+
+def make_config(tables=None, long_lines=None, **normalize):
+    config = get_default_config()
+    config['normalize'].update(normalize)
+    for output_format in ('pdf', 'docx', 'latex'):
+        if tables:
+            config['normalize'][output_format]['tables'] = tables
+        if long_lines:
+            config['normalize'][output_format]['long_lines'] = long_lines
+    return config
+
+
+def make_table(rows):
+    return "| id | name |\n|---|--:|\n" + ''.join(f"| {i} | n_{i} |\n" for i in range(rows))
+
+
+def test_small_tables_and_code_are_unchanged():
+    text = "# Title\n\n" + make_table(3) + "\n```\nprint('hi')\n```\n"
+    assert normalize_markdown(text, 'pdf', make_config()) == text
+    assert normalize_markdown(text, 'pdf', make_config(enabled=False, max_table_rows=1)) == text
+
+
+def test_split_cells_keeps_escaped_pipes():
+    assert split_cells("| a \\| b | c |") == ['a | b', 'c']
+    assert split_cells("| a |", columns=3) == ['a', '', '']
+
+
+def test_latex_tables_are_chunked_into_tabulars():
+    config = make_config(max_table_rows=5, table_chunk_rows=4, tables='latex')
+    result = normalize_markdown(make_table(10) + "\nAfter\n", 'pdf', config)
+
+    assert result.count('```{=latex}') == 3
+    assert result.count('\\begin{tabular}{|l|r|}') == 3
+    assert '9 & n\\_9 \\\\' in result
+    assert result.endswith("\nAfter\n")
+
+
+def test_docx_tables_become_one_native_table():
+    config = make_config(max_table_rows=5, tables='docx')
+    result = normalize_markdown(make_table(10), 'docx', config)
+
+    assert result.count('```{=openxml}') == 1
+    assert result.count('<w:tr>') == 11
+    assert '<w:tblHeader/>' in result
+
+
+def test_unavailable_strategy_falls_back_to_split(capsys):
+    config = make_config(max_table_rows=5, table_chunk_rows=4)
+    config['normalize']['docx']['tables'] = 'latex'
+    result = normalize_markdown(make_table(10), 'docx', config)
+
+    assert result.count('| id | name |') == 3
+    assert result.count('|---|--:|') == 3
+    assert 'not available for docx' in capsys.readouterr().out
+
+
+def test_long_code_lines_are_wrapped_or_truncated():
+    text = "```\n" + "x" * 25 + "\nshort\n```\n"
+
+    wrapped = normalize_markdown(text, 'pdf', make_config(max_line_length=10, long_lines='wrap'))
+    assert wrapped == "```\nxxxxxxxxxx\nxxxxxxxxxx\nxxxxx\nshort\n```\n"
+
+    config = make_config(max_line_length=10)
+    config['normalize']['pdf']['long_lines'] = 'truncate'
+    assert normalize_markdown(text, 'pdf', config) == "```\nxxxxxxx...\nshort\n```\n"
+
+
+def test_long_code_blocks_are_cut_short():
+    text = "~~~~\n" + ''.join(f"line {i}\n" for i in range(10)) + "~~~~\n| a |\n"
+    result = normalize_markdown(text, 'latex', make_config(max_code_lines=3))
+
+    assert result == "~~~~\nline 0\nline 1\nline 2\n... 7 more lines omitted ...\n~~~~\n| a |\n"
+
+
+def test_long_code_blocks_are_kept_by_default():
+    text = "```\n" + ''.join(f"line {i}\n" for i in range(2500)) + "```\n"
+    assert normalize_markdown(text, 'docx', make_config()) == text
+
+
+def test_raw_blocks_are_not_wrapped():
+    raw_line = "\\begin{tabular}{" + "l" * 150 + "} % " + "x" * 40 + "\n"
+    text = "```{=latex}\n" + raw_line + "```\n\n```\n" + "y" * 15 + "\n```\n"
+    result = normalize_markdown(text, 'pdf', make_config(max_line_length=10, long_lines='wrap'))
+
+    assert result.startswith("```{=latex}\n" + raw_line + "```\n")
+    assert result.endswith("```\nyyyyyyyyyy\nyyyyy\n```\n")
+
+
+def test_defaults_are_lossless():
+    table = make_table(500)
+    code = "```\n" + "curl https://example.com/" + "x" * 200 + "\n```\n"
+    result = normalize_markdown(table + "\n" + code, 'pdf', make_config())
+
+    assert '{=latex}' not in result
+    assert result.count('| id | name |') == 13
+    assert result.endswith(code)
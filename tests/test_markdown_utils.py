@@ -3,7 +3,9 @@ import subprocess
 import subprocess
 from unittest.mock import patch
 
-from markdown_utils import run_pandoc, run_pdflatex, sanitize_text
+from markdown_utils import (
+    run_pandoc, run_pdflatex, sanitize_text, get_unique_filename, release_filename
+)
 
 
 def test_run_pandoc_returns_false_on_error(tmp_path):
@@ -43,6 +45,20 @@ def test_run_pdflatex_error_no_pdf(tmp_path):
     assert not success
     assert result_pdf is None
 
+
+def test_run_pdflatex_searches_extra_dirs_first(tmp_path, monkeypatch):
+    monkeypatch.setenv('TEXINPUTS', '/usr/share/mytex:')
+    seen = {}
+
+    def fake_run(*args, **kwargs):
+        seen['texinputs'] = kwargs['env']['TEXINPUTS']
+        return subprocess.CompletedProcess(args[0], 0, stdout=b'', stderr=b'')
+
+    with patch('subprocess.run', side_effect=fake_run):
+        run_pdflatex(str(tmp_path / 'doc.tex'), str(tmp_path), search_dirs=[str(tmp_path / 'img')])
+
+    assert seen['texinputs'] == os.pathsep.join([str(tmp_path / 'img'), '/usr/share/mytex:'])
+
 def test_sanitize_text_removes_non_ascii_and_emoji():
     # Remove emoji and special characters, preserving ASCII content
     assert sanitize_text("Hello 🐍!") == "Hello !"
@@ -54,3 +70,35 @@ def test_sanitize_text_removes_non_ascii_and_emoji():
     # Approximately equal symbol
     assert sanitize_text("a ≈ b") == "a ~= b"
     assert sanitize_text("Quote: “text” and ‘more’") == "Quote: \"text\" and 'more'"
+
+
+def test_released_filenames_can_be_reused(tmp_path):
+    basename = str(tmp_path / 'out.pdf')
+    first = get_unique_filename(basename)
+    assert get_unique_filename(basename) == str(tmp_path / 'out-1.pdf')
+
+    release_filename(first)
+    assert get_unique_filename(basename) == first
+    release_filename(first)
+    release_filename(str(tmp_path / 'out-1.pdf'))
+
+
+def test_run_pandoc_uses_the_job_tool_environment():
+    import contextvars
+    from markdown_utils import set_tool_environment
+    seen = []
+
+    def fake_run(*args, **kwargs):
+        seen.append(kwargs['env'])
+        return subprocess.CompletedProcess(args[0], 0, stdout=b'', stderr=b'')
+
+    def job():
+        set_tool_environment({'PATH': '/client/bin', 'SOURCE_DATE_EPOCH': '1'})
+        run_pandoc(['pandoc'], 'text')
+
+    with patch('subprocess.run', side_effect=fake_run):
+        contextvars.copy_context().run(job)
+        run_pandoc(['pandoc'], 'text')
+
+    assert seen[0]['PATH'] == '/client/bin' and seen[0]['SOURCE_DATE_EPOCH'] == '1'
+    assert seen[1]['PATH'] == os.environ['PATH']
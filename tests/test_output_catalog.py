@@ -0,0 +1,60 @@
+import os
+import json
+import datetime
+
+from markdown_utils import get_dated_filename
+from output_catalog import (
+    connect, record_conversion, search_sources, list_conversions, get_next_suffix,
+    split_output_name
+)
+
+
+def write_output(path, content='output'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+def test_split_output_name():
+    assert split_output_name('PDF/20250525Hello-3.pdf') == ('PDF', '20250525Hello', 'pdf', 3)
+    assert split_output_name('PDF/20250525Hello.pdf') == ('PDF', '20250525Hello', 'pdf', 0)
+
+
+def test_record_and_search(tmp_path):
+    catalog = connect(str(tmp_path / 'catalog.sqlite3'))
+    pdf = write_output(str(tmp_path / 'PDF' / '20250301Revenue.pdf'))
+    docx = write_output(str(tmp_path / 'DOCX' / '20250301Revenue.docx'))
+    text = '# Revenue\n\nQuarterly revenue grew in March.'
+
+    record_conversion(catalog, 'pdf', text, 'Revenue', ['pandoc', '-o', pdf], pdf,
+                      timings={'pandoc': 0.5})
+    record_conversion(catalog, 'docx', text, 'Revenue', ['pandoc', '-o', docx], docx)
+    record_conversion(catalog, 'pdf', '# Other', None, [], str(tmp_path / 'missing.pdf'))
+
+    rows = search_sources(catalog, 'quarterly')
+    assert sorted(row['format'] for row in rows) == ['docx', 'pdf']
+    assert '[Quarterly]' in rows[0]['snippet']
+    assert search_sources(catalog, 'nonexistent') == []
+
+    # Sources are indexed once regardless of how many outputs they produced
+    assert catalog.execute('SELECT COUNT(*) FROM sources_fts').fetchone()[0] == 1
+
+    pdf_rows = list_conversions(catalog, output_format='pdf')
+    assert len(pdf_rows) == 1
+    assert json.loads(pdf_rows[0]['timings']) == {'pandoc': 0.5}
+    today = datetime.date.today().isoformat()
+    assert len(list_conversions(catalog, since=today, until=today)) == 2
+
+
+def test_dated_filename_uses_catalog_suffix(tmp_path):
+    catalog = connect(str(tmp_path / 'catalog.sqlite3'))
+    output_dir = str(tmp_path / 'PDF')
+    base = datetime.date.today().strftime('%Y%m%d') + 'Notes'
+    for name in (f'{base}.pdf', f'{base}-1.pdf', f'{base}-2.pdf'):
+        path = write_output(os.path.join(output_dir, name))
+        record_conversion(catalog, 'pdf', '# Notes', 'Notes', [], path)
+
+    assert get_next_suffix(catalog, output_dir, base, 'pdf') == 3
+    assert get_dated_filename(output_dir, 'pdf', custom_slug='Notes', catalog=catalog) == \
+        os.path.join(output_dir, f'{base}-3.pdf')
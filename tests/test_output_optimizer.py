@@ -0,0 +1,95 @@
+import zipfile
+from unittest.mock import patch
+
+from output_optimizer import optimize_output, optimize_outputs, report_saving
+
+DOCUMENT_RELS = (
+    '<Relationships>'
+    '<Relationship Id="rId1" Target="media/image1.png"/>'
+    '<Relationship Id="rId2" Target="media/image2.png"/>'
+    '</Relationships>'
+)
+
+
+CONTENT_TYPES = (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-'
+    'officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/media/image1.png" ContentType="image/png"/>'
+    '<Override PartName="/word/media/image2.png" ContentType="image/png"/>'
+    '</Types>'
+)
+
+
+def make_docx(path):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('word/document.xml', '<w:document>' + 'text ' * 2000 + '</w:document>')
+        archive.writestr('word/_rels/document.xml.rels', DOCUMENT_RELS)
+        archive.writestr('word/media/image1.png', b'\x89PNG' + b'\x00' * 1000)
+        archive.writestr('word/media/image2.png', b'\x89PNG' + b'\x00' * 1000)
+
+
+def docx_config():
+    return {'optimize': {'docx': {'enabled': True}}}
+
+
+def test_docx_is_repacked_and_media_deduplicated(tmp_path):
+    path = tmp_path / 'doc.docx'
+    make_docx(path)
+
+    result = optimize_output(str(path), docx_config())
+
+    assert result['saved'] > 0
+    assert result['after'] == path.stat().st_size
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        rels = archive.read('word/_rels/document.xml.rels').decode()
+        content_types = archive.read('[Content_Types].xml').decode()
+    assert names[0] == '[Content_Types].xml'
+    assert 'word/media/image2.png' not in names
+    assert rels.count('Target="media/image1.png"') == 2
+    assert 'PartName="/word/media/image2.png"' not in content_types
+    assert 'PartName="/word/media/image1.png"' in content_types
+    assert 'PartName="/word/document.xml"' in content_types
+
+
+def test_disabled_formats_are_skipped(tmp_path):
+    path = tmp_path / 'doc.docx'
+    make_docx(path)
+    before = path.read_bytes()
+
+    assert optimize_output(str(path), {'optimize': {'docx': {'enabled': False}}}) is None
+    assert optimize_output(str(path), {}) is None
+    assert path.read_bytes() == before
+
+
+def test_pdf_skipped_without_qpdf(tmp_path):
+    path = tmp_path / 'doc.pdf'
+    path.write_bytes(b'%PDF-1.5')
+    config = {'optimize': {'pdf': {'enabled': True}}}
+    with patch('shutil.which', return_value=None):
+        assert optimize_output(str(path), config) is None
+    assert path.read_bytes() == b'%PDF-1.5'
+
+
+def test_optimize_outputs_uses_pool(tmp_path):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f'doc{index}.docx'
+        make_docx(path)
+        paths.append(str(path))
+
+    results = optimize_outputs(paths, docx_config(), workers=2)
+    assert sorted(result['path'] for result in results) == paths
+
+
+def test_report_saving_never_claims_negative_savings(capsys):
+    report_saving({'path': 'a.pdf', 'before': 1000, 'after': 900, 'saved': 100})
+    assert 'saved 100 bytes (10.0%)' in capsys.readouterr().out
+
+    report_saving({'path': 'a.pdf', 'before': 1000, 'after': 1040, 'saved': -40})
+    output = capsys.readouterr().out
+    assert 'saved' not in output
+    assert '40 bytes larger' in output
@@ -0,0 +1,52 @@
+from unittest.mock import patch
+
+from markdown_utils import get_default_config
+from pipeline_scheduler import estimate_cost, get_document_features, run_pipeline
+
+
+def test_document_features():
+    text = (
+        "Inline $x^2$ and display $$y$$.\n\n"
+        "| a | b |\n|---|---|\n| 1 | 2 |\n\n"
+        "```\nline one\nline two\n```\n\n"
+        "![fig](plot.png)\n"
+    )
+    features = get_document_features(text)
+    assert features['table_rows'] == 3
+    assert features['code_lines'] == 3
+    assert features['math'] == 3
+    assert features['images'] == 1
+
+
+def test_tables_and_math_cost_more_than_prose():
+    prose = "word " * 200
+    heavy = "| a | b |\n" * 100 + "$$x$$\n" * 20
+    assert estimate_cost(heavy)['tex'] > estimate_cost(prose)['tex']
+
+
+def test_run_pipeline_dispatches_longest_first_and_keeps_order():
+    jobs = [("short", "a"), ("| x |\n" * 500, "b"), ("medium " * 100, "c")]
+    pandoc_order = []
+
+    def fake_pandoc_stage(markdown_text, config, slug):
+        pandoc_order.append(slug)
+        return {'output_tex': f"{slug}.tex"}
+
+    def fake_tex_stage(stage, has_pdflatex, config):
+        return stage['output_tex'], stage['output_tex'].replace('.tex', '.pdf')
+
+    with patch('MarkdownConverter.latex_pandoc_stage', side_effect=fake_pandoc_stage), \
+            patch('MarkdownConverter.latex_tex_stage', side_effect=fake_tex_stage):
+        results = run_pipeline(jobs, True, get_default_config(), pandoc_workers=1,
+                               tex_workers=2, adaptive=False, adjust_interval=0.05)
+
+    assert pandoc_order == ['b', 'c', 'a']
+    assert results == [('a.tex', 'a.pdf'), ('b.tex', 'b.pdf'), ('c.tex', 'c.pdf')]
+
+
+def test_run_pipeline_reports_pandoc_failures():
+    with patch('MarkdownConverter.latex_pandoc_stage',
+               return_value={'output_tex': None, 'failed_tex': 'x.tex'}):
+        results = run_pipeline([("text", None)], True, get_default_config(),
+                               pandoc_workers=1, tex_workers=1, adjust_interval=0.05)
+    assert results == [('x.tex', None)]
@@ -0,0 +1,123 @@
+import subprocess
+import threading
+import urllib.request
+from unittest.mock import patch
+
+import preview_server
+from markdown_utils import get_default_config
+from preview_server import get_page_style, render_preview, PreviewState, make_handler
+
+
+def fake_pandoc(calls):
+    def fake_run(args, **kwargs):
+        calls.append(args)
+        body = b'<h1>' + kwargs['input'].strip(b'# \n') + b'</h1>'
+        return subprocess.CompletedProcess(args, 0, stdout=body, stderr=b'')
+    return fake_run
+
+
+def test_page_style_follows_pdf_config():
+    style = get_page_style({'geometry': {'margin': '2cm', 'paper': 'a4paper'},
+                            'font': {'family': 'Arial', 'size': '12pt'}})
+    assert style == {'width': '210mm', 'margin': '2cm', 'font_family': 'Arial', 'font_size': '12pt'}
+
+
+def test_render_preview_is_cached():
+    preview_server._render_cache.clear()
+    calls = []
+    with patch('subprocess.run', side_effect=fake_pandoc(calls)):
+        page, version = render_preview('# Title', get_default_config())
+        again, same_version = render_preview('# Title', get_default_config())
+        _, other_version = render_preview('# Other', get_default_config())
+
+    assert len(calls) == 2
+    assert '--mathjax' in calls[0]
+    assert '<h1>Title</h1>' in page
+    assert page == again and version == same_version != other_version
+    assert 'width: 8.5in' in page
+
+
+def test_server_serves_page_and_reloads_on_change(tmp_path):
+    from http.server import ThreadingHTTPServer
+
+    preview_server._render_cache.clear()
+    doc = tmp_path / 'notes.md'
+    doc.write_text('# First')
+    calls = []
+    with patch('subprocess.run', side_effect=fake_pandoc(calls)):
+        state = PreviewState(str(doc), get_default_config())
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            assert '<h1>First</h1>' in urllib.request.urlopen(url + '/').read().decode()
+            first_version = urllib.request.urlopen(url + '/version').read().decode()
+
+            doc.write_text('# Second')
+            state.mtime = None
+            state.refresh()
+            assert urllib.request.urlopen(url + '/version').read().decode() != first_version
+            assert '<h1>Second</h1>' in urllib.request.urlopen(url + '/').read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_is_local_host():
+    assert preview_server.is_local_host('127.0.0.1:8000')
+    assert preview_server.is_local_host('localhost')
+    assert preview_server.is_local_host('http://localhost:8000')
+    assert not preview_server.is_local_host('evil.example:8000')
+    assert not preview_server.is_local_host(None)
+
+
+def test_pdf_is_built_only_on_local_post(tmp_path):
+    from http.server import ThreadingHTTPServer
+    from urllib.error import HTTPError
+
+    preview_server._render_cache.clear()
+    doc = tmp_path / 'notes.md'
+    doc.write_text('# Doc')
+    pdf = tmp_path / 'notes.pdf'
+    pdf.write_bytes(b'%PDF-1.4')
+    with patch('subprocess.run', side_effect=fake_pandoc([])):
+        state = PreviewState(str(doc), get_default_config())
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def status(request):
+        try:
+            return urllib.request.urlopen(request).status
+        except HTTPError as e:
+            return e.code
+
+    try:
+        with patch.object(PreviewState, 'build_pdf', return_value=str(pdf)) as build:
+            assert status(url + '/pdf') == 405
+            assert status(urllib.request.Request(url + '/', headers={'Host': 'evil.example'})) == 403
+            assert status(urllib.request.Request(url + '/pdf', data=b'', headers={'Host': 'evil.example'})) == 403
+            assert status(urllib.request.Request(url + '/pdf', data=b'', headers={'Origin': 'http://evil.example'})) == 403
+            assert build.call_count == 0
+
+            response = urllib.request.urlopen(urllib.request.Request(url + '/pdf', data=b''))
+            assert response.read() == b'%PDF-1.4'
+            assert build.call_count == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_build_pdf_runs_in_the_document_directory(tmp_path):
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    doc = docs / 'notes.md'
+    doc.write_text('# Notes\n\n![Plot](plot.png)\n')
+    with patch('subprocess.run', side_effect=fake_pandoc([])):
+        state = PreviewState(str(doc), get_default_config())
+
+    with patch('MarkdownConverter.convert_to_pdf', return_value='out.pdf') as convert:
+        assert state.build_pdf() == 'out.pdf'
+
+    assert convert.call_args.kwargs['work_dir'] == str(docs)
+    assert convert.call_args.args[2] == 'notes'
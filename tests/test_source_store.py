@@ -0,0 +1,75 @@
+import os
+import gzip
+import threading
+
+from markdown_utils import save_markdown_file
+from source_store import collect_garbage, get_store_stats, write_blob
+
+
+def make_config(tmp_path, compression='none'):
+    return {'global': {'source_store': {
+        'enabled': True, 'dir': str(tmp_path / 'store'), 'compression': compression
+    }}}
+
+
+def test_identical_sources_share_one_blob(tmp_path):
+    config = make_config(tmp_path)
+    first = save_markdown_file('# Hello', str(tmp_path / 'a.pdf'), config)
+    second = save_markdown_file('# Hello', str(tmp_path / 'b.docx'), config)
+
+    assert first == str(tmp_path / 'a.md')
+    assert open(second).read() == '# Hello'
+    assert os.stat(first).st_ino == os.stat(second).st_ino
+    stats = get_store_stats(str(tmp_path / 'store'))
+    assert stats['blobs'] == 1
+    assert stats['references'] == 2
+
+
+def test_concurrent_writes_of_the_same_blob(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def write():
+        barrier.wait()
+        try:
+            write_blob(store_dir, '# Same text\n' * 10000, 'none')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert get_store_stats(store_dir)['blobs'] == 1
+
+
+def test_gzip_compression(tmp_path):
+    config = make_config(tmp_path, 'gzip')
+    saved = save_markdown_file('# Hello', str(tmp_path / 'a.pdf'), config)
+
+    assert saved == str(tmp_path / 'a.md.gz')
+    assert gzip.decompress(open(saved, 'rb').read()) == b'# Hello'
+
+
+def test_gc_removes_only_unreferenced_blobs(tmp_path):
+    config = make_config(tmp_path)
+    store_dir = str(tmp_path / 'store')
+    kept = save_markdown_file('# Kept', str(tmp_path / 'a.pdf'), config)
+    dropped = save_markdown_file('# Dropped', str(tmp_path / 'b.pdf'), config)
+    os.remove(dropped)
+
+    assert collect_garbage(store_dir, dry_run=True) == (1, len('# Dropped'))
+    assert get_store_stats(store_dir)['blobs'] == 2
+    assert collect_garbage(store_dir) == (1, len('# Dropped'))
+    assert get_store_stats(store_dir)['blobs'] == 1
+    assert open(kept).read() == '# Kept'
+
+
+def test_store_disabled_writes_plain_file(tmp_path):
+    saved = save_markdown_file('# Hello', str(tmp_path / 'a.pdf'), {'global': {}})
+    assert os.stat(saved).st_nlink == 1
+    assert open(saved).read() == '# Hello'
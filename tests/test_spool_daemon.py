@@ -0,0 +1,117 @@
+import os
+import json
+import socket
+from unittest.mock import patch
+
+from markdown_utils import get_default_config
+from spool_daemon import (
+    ensure_spool_dirs, claim_next_job, finish_job, recover_orphaned_jobs, run_job
+)
+
+
+def make_spool(tmp_path):
+    spool = str(tmp_path / 'spool')
+    ensure_spool_dirs(spool)
+    worker_dir = os.path.join(spool, 'work', 'test-worker')
+    os.makedirs(worker_dir)
+    return spool, worker_dir
+
+
+def test_claim_moves_job_and_sidecar(tmp_path):
+    spool, worker_dir = make_spool(tmp_path)
+    inbox = os.path.join(spool, 'inbox')
+    with open(os.path.join(inbox, 'job.json'), 'w') as f:
+        json.dump({'format': 'docx'}, f)
+    with open(os.path.join(inbox, 'job.md'), 'w') as f:
+        f.write('# Hello')
+
+    claimed = claim_next_job(spool, worker_dir)
+
+    assert os.path.dirname(os.path.dirname(claimed)) == worker_dir
+    assert os.path.basename(claimed) == 'job.md'
+    assert os.path.exists(os.path.join(os.path.dirname(claimed), 'job.json'))
+    assert os.listdir(inbox) == []
+    assert claim_next_job(spool, worker_dir) is None
+
+
+def test_failed_job_is_retried_then_moved_to_failed(tmp_path):
+    spool, worker_dir = make_spool(tmp_path)
+    md_path = os.path.join(worker_dir, 'job.md')
+    with open(md_path, 'w') as f:
+        f.write('# Hello')
+
+    finish_job(md_path, spool, {'success': False, 'outputs': [], 'error': 'boom'},
+               max_retries=1, backoff=60)
+
+    inbox_md = os.path.join(spool, 'inbox', 'job.md')
+    assert os.path.exists(inbox_md)
+    with open(os.path.join(spool, 'inbox', 'job.json')) as f:
+        assert json.load(f)['attempts'] == 1
+    # Still backing off, so it cannot be claimed yet
+    assert claim_next_job(spool, worker_dir) is None
+
+    os.replace(inbox_md, md_path)
+    os.replace(os.path.join(spool, 'inbox', 'job.json'), os.path.join(worker_dir, 'job.json'))
+    finish_job(md_path, spool, {'success': False, 'outputs': [], 'error': 'boom'},
+               max_retries=1, backoff=60)
+
+    failed = os.path.join(spool, 'failed')
+    assert sorted(os.listdir(failed)) == ['job.json', 'job.md', 'job.result.json']
+
+
+def test_jobs_with_the_same_name_never_replace_each_other(tmp_path):
+    spool, worker_dir = make_spool(tmp_path)
+    inbox = os.path.join(spool, 'inbox')
+    claimed = []
+    for text in ('# First', '# Second'):
+        with open(os.path.join(inbox, 'report.md'), 'w') as f:
+            f.write(text)
+        claimed.append(claim_next_job(spool, worker_dir))
+
+    assert claimed[0] != claimed[1]
+    with open(claimed[0]) as f:
+        assert f.read() == '# First'
+
+    for md_path in claimed:
+        finish_job(md_path, spool, {'success': True, 'outputs': []}, max_retries=0, backoff=0)
+
+    done = os.path.join(spool, 'done')
+    assert sorted(os.listdir(done)) == ['report-1.md', 'report-1.result.json',
+                                        'report.md', 'report.result.json']
+    with open(os.path.join(done, 'report-1.md')) as f:
+        assert f.read() == '# Second'
+
+
+def test_recover_orphaned_jobs(tmp_path):
+    spool, _ = make_spool(tmp_path)
+    dead_dir = os.path.join(spool, 'work', f"{socket.gethostname()}-999999")
+    os.makedirs(os.path.join(dead_dir, 'job-abc'))
+    with open(os.path.join(dead_dir, 'job.md'), 'w') as f:
+        f.write('# Hello')
+    with open(os.path.join(dead_dir, 'job-abc', 'job.md'), 'w') as f:
+        f.write('# Hello again')
+
+    with patch('spool_daemon.is_process_alive', return_value=False):
+        assert recover_orphaned_jobs(spool) == 2
+
+    assert sorted(os.listdir(os.path.join(spool, 'inbox'))) == ['job-1.md', 'job.md']
+    assert not os.path.exists(dead_dir)
+
+
+def test_run_job_applies_sidecar(tmp_path):
+    md_path = tmp_path / 'job.md'
+    md_path.write_text('# Hello')
+    (tmp_path / 'job.json').write_text(json.dumps(
+        {'format': 'docx', 'slug': 'Report', 'config': {'docx': {'font': {'size': '9pt'}}}}
+    ))
+    output = tmp_path / 'out.docx'
+    output.write_text('docx')
+
+    with patch('MarkdownConverter.convert_to_word', return_value=str(output)) as mock:
+        result = run_job(str(md_path), get_default_config(), has_pdflatex=False)
+
+    assert result == {'success': True, 'outputs': [str(output)]}
+    _, config, slug = mock.call_args[0]
+    assert slug == 'Report'
+    assert config['docx']['font'] == {'family': 'Times New Roman', 'size': '9pt'}
+    assert config['global']['auto_open_output'] is False
@@ -0,0 +1,166 @@
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from image_assets import prepare_images
+from markdown_utils import get_default_config, get_tool_environment
+from warm_daemon import (
+    WarmConverter, find_daemon, relay_response, resolve_config_paths, run_in_daemon
+)
+
+
+def make_warm_converter():
+    with patch('shutil.which', return_value='/usr/bin/true'):
+        return WarmConverter()
+
+
+def test_find_daemon_respects_environment(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / 'daemon.sock')
+    monkeypatch.setenv('MARKDOWN_CONVERTER_SOCKET', socket_path)
+    assert find_daemon() is None
+
+    open(socket_path, 'w').close()
+    assert find_daemon() == socket_path
+
+    monkeypatch.setenv('MARKDOWN_CONVERTER_DAEMON', '0')
+    assert find_daemon() is None
+
+
+def test_stale_socket_falls_back_to_in_process(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / 'daemon.sock')
+    monkeypatch.setenv('MARKDOWN_CONVERTER_SOCKET', socket_path)
+    open(socket_path, 'w').close()
+
+    assert run_in_daemon({'entry': 'legacy-pdf', 'markdown': '# Hi'}) is None
+
+
+def test_handle_runs_job_in_client_directory(tmp_path):
+    warm = make_warm_converter()
+    seen = {}
+
+    def fake_convert_to_word(markdown_text, config, slug, work_dir):
+        seen['work_dir'] = work_dir
+        print("converting")
+        sys.stderr.write("pandoc: warning\n")
+        return 'DOCX/20250101Hi.docx'
+
+    with patch.object(warm.converter, 'convert_to_word', side_effect=fake_convert_to_word), \
+            patch.object(warm, 'get_config', return_value=get_default_config()):
+        response = warm.handle({'action': 'convert', 'entry': 'converter', 'format': 'docx',
+                                'markdown': '# Hi', 'slug': None, 'cwd': str(tmp_path)})
+
+    assert seen['work_dir'] == str(tmp_path)
+    assert os.getcwd() != str(tmp_path)
+    assert response['ok'] is True
+    assert response['result'] == ['DOCX/20250101Hi.docx']
+    assert response['stdout'] == "converting\n✅ DOCX created: DOCX/20250101Hi.docx\n"
+    assert response['stderr'] == "pandoc: warning\n"
+
+
+def test_jobs_run_concurrently_with_separate_output(tmp_path):
+    warm = make_warm_converter()
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_convert_to_pdf(markdown_text, config, slug, work_dir):
+        print(f"start {slug}")
+        barrier.wait()  # Both jobs must be running at once to get past this
+        print(f"end {slug}")
+        return f"{work_dir}/PDF/{slug}.pdf"
+
+    responses = {}
+
+    def run(slug):
+        responses[slug] = warm.handle({'action': 'convert', 'entry': 'converter', 'format': 'pdf',
+                                       'markdown': '# Hi', 'slug': slug,
+                                       'cwd': str(tmp_path / slug)})
+
+    with patch.object(warm.converter, 'convert_to_pdf', side_effect=fake_convert_to_pdf), \
+            patch.object(warm, 'get_config', return_value=get_default_config()):
+        threads = [threading.Thread(target=run, args=(slug,)) for slug in ('a', 'b')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    for slug in ('a', 'b'):
+        output = f"{tmp_path / slug}/PDF/{slug}.pdf"
+        assert responses[slug]['ok'] is True
+        assert responses[slug]['stdout'] == f"start {slug}\nend {slug}\n✅ PDF created: {output}\n"
+
+
+def test_config_paths_are_relative_to_the_client(tmp_path):
+    config = get_default_config()
+    config['bibliography']['files'] = ['refs.bib', '/abs/other.bib']
+    config['bibliography']['csl'] = ''
+    resolve_config_paths(config, str(tmp_path))
+
+    assert config['bibliography']['files'] == [str(tmp_path / 'refs.bib'), '/abs/other.bib']
+    assert config['bibliography']['csl'] == ''
+    assert config['catalog']['path'] == os.path.expanduser(get_default_config()['catalog']['path'])
+
+
+def test_handle_reports_exit_and_errors(tmp_path):
+    warm = make_warm_converter()
+
+    with patch.object(warm.converter, 'convert_to_pdf', side_effect=SystemExit(1)), \
+            patch.object(warm, 'get_config', return_value=get_default_config()):
+        response = warm.handle({'action': 'convert', 'entry': 'converter', 'format': 'pdf',
+                                'markdown': '# Hi', 'cwd': str(tmp_path)})
+    assert response['ok'] is False
+    assert response['exit'] == 1
+
+    response = warm.handle({'action': 'convert', 'entry': 'unknown', 'cwd': str(tmp_path)})
+    assert response == {'ok': False, 'error': "unknown entry point 'unknown'"}
+
+
+def test_relay_response_prints_output_and_exits(capsys):
+    relay_response({'ok': True, 'stdout': 'PDF created: PDF/a.pdf\n', 'stderr': 'warning\n',
+                    'exit': None})
+    captured = capsys.readouterr()
+    assert captured.out == 'PDF created: PDF/a.pdf\n'
+    assert captured.err == 'warning\n'
+
+    with pytest.raises(SystemExit) as excinfo:
+        relay_response({'ok': False, 'stdout': '', 'error': 'boom', 'exit': 2})
+    assert excinfo.value.code == 2
+    assert capsys.readouterr().out == 'Error: boom\n'
+
+
+def test_jobs_use_the_client_environment_and_capture_helper_threads(tmp_path):
+    warm = make_warm_converter()
+    (tmp_path / 'plot.png').write_bytes(b'fake png data')
+    config = get_default_config()
+    config['images']['cache_dir'] = str(tmp_path / 'cache')
+    seen = {}
+
+    def failing_process(source_path, target_path, settings):
+        seen['epoch'] = get_tool_environment().get('SOURCE_DATE_EPOCH')
+        raise RuntimeError('boom')
+
+    def fake_convert_to_pdf(markdown_text, config, slug, work_dir):
+        prepare_images(markdown_text, 'pdf', config, work_dir)
+        return 'PDF/x.pdf'
+
+    with patch.object(warm.converter, 'convert_to_pdf', side_effect=fake_convert_to_pdf), \
+            patch.object(warm, 'get_config', return_value=config), \
+            patch('image_assets.process_raster_image', side_effect=failing_process):
+        response = warm.handle({'action': 'convert', 'entry': 'converter', 'format': 'pdf',
+                                'markdown': '![x](plot.png)', 'cwd': str(tmp_path),
+                                'env': {'PATH': os.environ['PATH'], 'SOURCE_DATE_EPOCH': '42'}})
+
+    assert seen['epoch'] == '42'
+    assert 'Warning: Failed to process image' in response['stdout']
+    assert get_tool_environment().get('SOURCE_DATE_EPOCH') == os.environ.get('SOURCE_DATE_EPOCH')
+
+
+def test_run_in_daemon_sends_the_client_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('TEXINPUTS', '/my/tex:')
+    with patch('warm_daemon.send_request', return_value={'ok': True}) as send:
+        run_in_daemon({'entry': 'legacy-pdf', 'markdown': '# Hi'}, str(tmp_path / 'd.sock'))
+
+    request = send.call_args.args[0]
+    assert request['env']['TEXINPUTS'] == '/my/tex:'
+    assert request['cwd'] == os.getcwd()
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Warm Daemon - Resident converter process for scripted use
+
+Scripts that call MarkdownConverter.py or the legacy MarkdownToPDF.py,
+MarkdownToWord.py and MarkdownToLatex.py thousands of times pay for tool
+probing, configuration loading and cold caches on every call. The warm
+daemon keeps the configuration, tool checks, bibliography and catalog
+caches resident and runs conversions on behalf of thin clients that connect
+over a Unix domain socket.
+
+Every entry point uses the daemon automatically when it is running and
+falls back to converting in-process when it is not:
+
+    python warm_daemon.py start &     # keep a warm converter running
+    python warm_daemon.py status
+    python warm_daemon.py bench -n 20 # compare against a cold start
+    python warm_daemon.py stop
+
+Set MARKDOWN_CONVERTER_DAEMON=0 to never use the daemon, and
+MARKDOWN_CONVERTER_SOCKET to use a different socket path.
+
+Jobs run concurrently: each is given its client's directory instead of
+changing the daemon's, runs its tools with the client's environment, and
+has its stdout and stderr (including that of its helper threads) captured
+and relayed to the client.
+
+Clients only need the socket and JSON modules, so everything else,
+including the converters, is imported by the functions that run in the
+daemon or the benchmark.
+"""
+import os
+import sys
+import json
+import socket
+
+DEFAULT_SOCKET = '~/.markdown-converter/daemon.sock'
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+LEGACY_SCRIPTS = {
+    'legacy-pdf': os.path.join(REPO_DIR, 'legacy', 'MarkdownToPDF', 'MarkdownToPDF.py'),
+    'legacy-word': os.path.join(REPO_DIR, 'legacy', 'MarkdownToWord', 'MarkdownToWord.py'),
+    'legacy-latex': os.path.join(REPO_DIR, 'legacy', 'MarkdownToLatex', 'MarkdownToLatex.py'),
+}
+
+# Configuration settings holding paths, which a client means relative to its
+# own directory rather than the daemon's
+PATH_SETTINGS = [
+    ('bibliography', 'files'),
+    ('bibliography', 'csl'),
+    ('bibliography', 'cache_dir'),
+    ('images', 'cache_dir'),
+    ('catalog', 'path'),
+    ('global', 'source_store', 'dir'),
+]
+
+
+def get_socket_path():
+    """Return the daemon socket path."""
+    return os.path.expanduser(os.environ.get('MARKDOWN_CONVERTER_SOCKET', DEFAULT_SOCKET))
+
+
+def find_daemon():
+    """
+    Return the socket path of a running daemon, or None.
+
+    Only checks that the socket exists; a stale socket is detected when
+    run_in_daemon fails to connect.
+    """
+    if os.environ.get('MARKDOWN_CONVERTER_DAEMON', '1') == '0' or not hasattr(socket, 'AF_UNIX'):
+        return None
+    path = get_socket_path()
+    return path if os.path.exists(path) else None
+
+
+def send_request(request, socket_path, timeout=None):
+    """Send a JSON request and return the decoded JSON response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+
+def run_in_daemon(job, socket_path=None):
+    """
+    Run a conversion job in the daemon.
+
+    Args:
+        job: Dict with 'entry' and 'markdown', plus 'format' and 'slug' for
+            the unified converter
+        socket_path: Daemon socket (default: find_daemon())
+
+    Returns:
+        dict or None: The daemon's response, or None if no daemon accepted
+        the job and the caller should convert in-process
+    """
+    socket_path = socket_path or find_daemon()
+    if socket_path is None:
+        return None
+    request = dict(job, action='convert', cwd=os.getcwd(), env=dict(os.environ))
+    try:
+        return send_request(request, socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        return None  # Stale socket; the daemon is not running
+    except OSError as e:
+        return {'ok': False, 'stdout': '', 'error': f"daemon request failed: {e}"}
+
+
+def relay_response(response):
+    """Print a daemon response as if the conversion had run in-process."""
+    sys.stdout.write(response.get('stdout', ''))
+    sys.stdout.flush()
+    sys.stderr.write(response.get('stderr', ''))
+    sys.stderr.flush()
+    if response.get('error'):
+        print(f"Error: {response['error']}")
+    if response.get('exit') is not None:
+        sys.exit(response['exit'])
+
+
+def resolve_config_paths(config, work_dir):
+    """Make the path settings in `config` absolute, relative to `work_dir`. Modifies `config`."""
+    def resolve(path):
+        return os.path.join(work_dir, os.path.expanduser(path))
+
+    for keys in PATH_SETTINGS:
+        section = config
+        for key in keys[:-1]:
+            section = section.get(key, {})
+        value = section.get(keys[-1])
+        if isinstance(value, list):
+            section[keys[-1]] = [resolve(path) for path in value]
+        elif value:
+            section[keys[-1]] = resolve(value)
+    return config
+
+
+class JobOutput:
+    """
+    Stream wrapper that sends each job's writes to that job's buffer.
+
+    Installed over sys.stdout and sys.stderr in the daemon. The buffer is a
+    context variable, so it follows a job into helper threads that run in
+    a copy of its context; writes outside any job go through unchanged.
+    """
+
+    def __init__(self, stream):
+        import contextvars
+        self.stream = stream
+        self.buffer = contextvars.ContextVar('job_output', default=None)
+
+    def capture(self):
+        """Capture the current context's writes and return the buffer."""
+        import io
+        buffer = io.StringIO()
+        self.buffer.set(buffer)
+        return buffer
+
+    def write(self, text):
+        buffer = self.buffer.get()
+        return (self.stream if buffer is None else buffer).write(text)
+
+    def flush(self):
+        if self.buffer.get() is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class WarmConverter:
+    """Conversion state kept warm between requests."""
+
+    def __init__(self):
+        # Imported here so clients never pay for them
+        import threading
+        import markdown_utils
+        import MarkdownConverter
+        self.markdown_utils = markdown_utils
+        self.converter = MarkdownConverter
+
+        markdown_utils.check_pandoc()
+        self.has_pdflatex = markdown_utils.check_pdflatex()
+        self.legacy_modules = {}
+        self.configs = {}
+        # Guards the caches above; jobs themselves run concurrently, each
+        # writing into its client's directory
+        self.lock = threading.Lock()
+
+    def get_config(self, work_dir):
+        """Return the configuration for `work_dir`, reloading it when it changes."""
+        paths = [os.path.join(work_dir, 'markdown-converter.json'),
+                 os.path.expanduser('~/markdown-converter.json')]
+        key = tuple((path, os.path.getmtime(path) if os.path.exists(path) else None)
+                    for path in paths)
+        with self.lock:
+            config = self.configs.get(key)
+        if config is None:
+            config = resolve_config_paths(self.markdown_utils.load_config(work_dir), work_dir)
+            with self.lock:
+                self.configs[key] = config
+        return config
+
+    def get_legacy_module(self, entry):
+        """Import (once) the legacy script for `entry`."""
+        with self.lock:
+            if entry not in self.legacy_modules:
+                import importlib.util
+                spec = importlib.util.spec_from_file_location(
+                    entry.replace('-', '_'), LEGACY_SCRIPTS[entry]
+                )
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                self.legacy_modules[entry] = module
+            return self.legacy_modules[entry]
+
+    def run_converter_job(self, job, config, work_dir):
+        """Run a unified-converter job and print what MarkdownConverter.main would."""
+        output_format = job.get('format')
+        markdown_text = job['markdown']
+        slug = job.get('slug')
+        if output_format == 'pdf':
+            output_file = self.converter.convert_to_pdf(markdown_text, config, slug, work_dir)
+            print(f"✅ PDF created: {output_file}")
+            return [output_file]
+        if output_format == 'docx':
+            output_file = self.converter.convert_to_word(markdown_text, config, slug, work_dir)
+            print(f"✅ DOCX created: {output_file}")
+            return [output_file]
+        if output_format == 'latex':
+            if not self.has_pdflatex and config['latex'].get('compile_pdf', True):
+                print("⚠️  Note: pdflatex not found. Only LaTeX file will be generated.")
+            return list(self.converter.convert_to_latex(
+                markdown_text, self.has_pdflatex, config, slug, work_dir
+            ))
+        raise ValueError(f"unknown format '{output_format}'")
+
+    def capture_output(self):
+        """
+        Capture stdout and stderr for the rest of the current context.
+
+        Returns:
+            tuple: (stdout, stderr) buffers
+        """
+        with self.lock:
+            for name in ('stdout', 'stderr'):
+                if not isinstance(getattr(sys, name), JobOutput):
+                    setattr(sys, name, JobOutput(getattr(sys, name)))
+            return sys.stdout.capture(), sys.stderr.capture()
+
+    def handle(self, request):
+        """Run a request and return the response dict."""
+        action = request.get('action')
+        if action == 'status':
+            return {'ok': True, 'pid': os.getpid(), 'has_pdflatex': self.has_pdflatex,
+                    'cached_configs': len(self.configs)}
+        if action != 'convert':
+            return {'ok': False, 'error': f"unknown action '{action}'"}
+
+        entry = request.get('entry')
+        if entry != 'converter' and entry not in LEGACY_SCRIPTS:
+            return {'ok': False, 'error': f"unknown entry point '{entry}'"}
+
+        # Output capture and the tool environment are set in a fresh context,
+        # so they end with the job
+        import contextvars
+        return contextvars.copy_context().run(self.run_job, request, entry)
+
+    def run_job(self, request, entry):
+        """Run a conversion request in the current context and return the response dict."""
+        work_dir = request['cwd']
+        response = {'ok': True, 'exit': None, 'result': None}
+        stdout, stderr = self.capture_output()
+        self.markdown_utils.set_tool_environment(request.get('env'))
+        try:
+            config = self.get_config(work_dir)
+            if entry == 'converter':
+                response['result'] = self.run_converter_job(request, config, work_dir)
+            else:
+                self.get_legacy_module(entry).convert(request['markdown'], config, work_dir)
+        except SystemExit as e:
+            response['exit'] = e.code
+            response['ok'] = e.code in (None, 0)
+        except Exception as e:
+            response['ok'] = False
+            response['error'] = str(e)
+        response['stdout'] = stdout.getvalue()
+        response['stderr'] = stderr.getvalue()
+        return response
+
+
+def serve(socket_path=None):
+    """Run the warm daemon until stopped."""
+    import threading
+    import socketserver
+
+    socket_path = socket_path or get_socket_path()
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    if os.path.exists(socket_path):
+        try:
+            send_request({'action': 'status'}, socket_path, timeout=1)
+            sys.exit(f"Error: a daemon is already running on {socket_path}.")
+        except OSError:
+            os.remove(socket_path)  # Left behind by a daemon that died
+
+    warm = WarmConverter()
+    stop_event = threading.Event()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            request = json.loads(self.rfile.read().decode('utf-8'))
+            if request.get('action') == 'shutdown':
+                response = {'ok': True}
+                stop_event.set()
+            else:
+                response = warm.handle(request)
+            self.wfile.write(json.dumps(response).encode('utf-8'))
+
+    server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+    server.daemon_threads = True
+    os.chmod(socket_path, 0o600)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🔥 Warm daemon listening on {socket_path} (pid {os.getpid()})")
+    try:
+        while not stop_event.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        print("👋 Warm daemon stopped.")
+
+
+def run_entry_point(script, markdown_text, cwd, env):
+    """Run an entry point as a fresh process and return its wall time in seconds."""
+    import time
+    import subprocess
+
+    started = time.perf_counter()
+    subprocess.run([sys.executable, script], input=markdown_text.encode('utf-8'),
+                   cwd=cwd, env=env, capture_output=True, check=False)
+    return time.perf_counter() - started
+
+
+def benchmark(runs=10, entry='legacy-pdf', clients=1):
+    """
+    Compare end-to-end latency of an entry point with and without the daemon.
+
+    Args:
+        runs: Number of conversions per mode
+        entry: Entry point to run (see LEGACY_SCRIPTS)
+        clients: Number of clients running conversions at the same time
+
+    Returns:
+        dict: Mean and median seconds per conversion and total wall seconds
+        for 'cold' and 'warm' runs
+    """
+    import time
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    socket_path = find_daemon()
+    if socket_path is None:
+        sys.exit("Error: start the daemon first (python warm_daemon.py start).")
+
+    markdown_text = "# Benchmark\n\nSome *text* with a table:\n\n| a | b |\n|---|---|\n| 1 | 2 |\n"
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='markdown-bench-') as work_dir:
+        with open(os.path.join(work_dir, 'markdown-converter.json'), 'w', encoding='utf-8') as f:
+            json.dump({'global': {'auto_open_output': False}}, f)
+        for mode in ('cold', 'warm'):
+            env = dict(os.environ, MARKDOWN_CONVERTER_DAEMON='0' if mode == 'cold' else '1')
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=clients) as executor:
+                times = sorted(executor.map(
+                    lambda _: run_entry_point(LEGACY_SCRIPTS[entry], markdown_text, work_dir, env),
+                    range(runs),
+                ))
+            results[mode] = {
+                'mean_s': round(sum(times) / len(times), 4),
+                'median_s': round(times[len(times) // 2], 4),
+                'wall_s': round(time.perf_counter() - started, 4),
+            }
+    return results
+
+
+def main(argv=None):
+    """Command-line interface for the warm daemon."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resident converter process for fast scripted use.")
+    parser.add_argument('--socket', help="Socket path (default: $MARKDOWN_CONVERTER_SOCKET or "
+                                         f"{DEFAULT_SOCKET})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('start', help="Run the daemon in the foreground")
+    subparsers.add_parser('stop', help="Stop a running daemon")
+    subparsers.add_parser('status', help="Show whether a daemon is running")
+    bench_parser = subparsers.add_parser('bench', help="Compare cold and warm end-to-end latency")
+    bench_parser.add_argument('-n', '--runs', type=int, default=10)
+    bench_parser.add_argument('--entry', choices=sorted(LEGACY_SCRIPTS), default='legacy-pdf')
+    bench_parser.add_argument('-c', '--clients', type=int, default=1,
+                              help="Conversions run at the same time (default: 1)")
+    args = parser.parse_args(argv)
+
+    if args.socket:
+        os.environ['MARKDOWN_CONVERTER_SOCKET'] = args.socket
+    socket_path = get_socket_path()
+
+    if args.command == 'start':
+        serve(socket_path)
+    elif args.command == 'bench':
+        results = benchmark(args.runs, args.entry, args.clients)
+        for mode, stats in results.items():
+            print(f"{mode}: mean {stats['mean_s'] * 1000:.1f} ms, "
+                  f"median {stats['median_s'] * 1000:.1f} ms, "
+                  f"{args.runs} runs in {stats['wall_s']:.2f} s")
+        speedup = results['cold']['wall_s'] / results['warm']['wall_s']
+        print(f"Warm daemon is {speedup:.1f}x faster end to end.")
+    else:
+        try:
+            response = send_request({'action': args.command if args.command == 'status'
+                                     else 'shutdown'}, socket_path, timeout=5)
+        except OSError:
+            print("No warm daemon is running.")
+            return
+        if args.command == 'status':
+            print(f"Warm daemon running (pid {response['pid']}, "
+                  f"pdflatex {'found' if response['has_pdflatex'] else 'not found'}).")
+        else:
+            print("Warm daemon stopping.")
+
+
+if __name__ == '__main__':
+    main()